@@ -1,23 +1,56 @@
-from flask import Flask
+from flask import Flask, g
 from config import Config
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
-from flask_restful import Api
+from sqlalchemy.orm import Session
 import logging
 
-app = Flask(__name__)
-app.config.from_object(Config)
+db = SQLAlchemy()
 
-api = Api(app)
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
 
-from app import routes, models
+def read_session():
+    """
+    Session for read-only queries, bound to the read replica when one is configured
+    :return: A session which lives until the end of the app context
+    """
+    if 'replica' not in db.engines:
+        return db.session
 
-# Setup console logging
-if not app.debug:
-    stream_handler = logging.StreamHandler()
-    stream_handler.setLevel(logging.INFO)
-    app.logger.addHandler(stream_handler)
+    if 'read_session' not in g:
+        g.read_session = Session(db.engines['replica'])
+    return g.read_session
 
-app.logger.setLevel(logging.INFO)
\ No newline at end of file
+
+def close_read_session(exception=None):
+    session = g.pop('read_session', None)
+    if session is not None:
+        session.close()
+
+
+def create_app(config=Config):
+    """
+    Create the Flask application, extensions are bound here instead of at import time
+    :param config: Configuration object to load
+    :return: The Flask application
+    """
+    app = Flask(__name__)
+    app.config.from_object(config)
+
+    db.init_app(app)
+    app.teardown_appcontext(close_read_session)
+
+    # Alembic is only needed by the `flask db` commands, not by the deployed API
+    if app.config['ENABLE_MIGRATIONS']:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+
+    from app import routes, models
+    app.register_blueprint(routes.bp)
+
+    # Setup console logging
+    if not app.debug:
+        stream_handler = logging.StreamHandler()
+        stream_handler.setLevel(logging.INFO)
+        app.logger.addHandler(stream_handler)
+
+    app.logger.setLevel(logging.INFO)
+    return app
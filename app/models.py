@@ -1,13 +1,21 @@
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
+
 from flask import jsonify
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import Column, JSON
-from sqlalchemy.types import ARRAY, String, Integer, Float
+from sqlalchemy import Column, JSON, ForeignKey, Index, cast, select, text
+from sqlalchemy.types import ARRAY, String, Integer, Float, DateTime, Text
 from flask_restful import fields
 
-from app import db
+from app import db, read_session
 from stats.team import Team
 
+if TYPE_CHECKING:  # stats.event imports requests, which the read-only API does not need
+    from stats.event import Event
+
 team_model_fields = {
+    'snapshot_id': fields.Integer,
+    'season': fields.Integer,
     'team_number': fields.Integer,
     'team_name': fields.String,
     'country': fields.String,
@@ -33,12 +41,34 @@ team_model_fields = {
     'historical_end_opr': fields.List(fields.Float)
 }
 
+team_search_fields = {
+    'season': fields.Integer,
+    'team_number': fields.Integer,
+    'team_name': fields.String,
+    'country': fields.String,
+    'state_province': fields.String,
+    'city': fields.String,
+    'epa_total': fields.Float,
+    'opr': fields.Float
+}
+
 class TeamModel(db.Model):
     """
     Model used to define the shape of teams in the database with sqlalchemy
     """
 
+    # Search indexes, trigram indexes need the pg_trgm extension
+    __table_args__ = (
+        Index('ix_team_model_number_prefix', 'snapshot_id', text('(team_number::text) text_pattern_ops')),
+        Index('ix_team_model_team_name_trgm', 'team_name', postgresql_using='gin', postgresql_ops={'team_name': 'gin_trgm_ops'}),
+        Index('ix_team_model_city_trgm', 'city', postgresql_using='gin', postgresql_ops={'city': 'gin_trgm_ops'}),
+        Index('ix_team_model_state_province_trgm', 'state_province', postgresql_using='gin',
+              postgresql_ops={'state_province': 'gin_trgm_ops'}),
+    )
+
     # General Info
+    snapshot_id = Column(Integer, ForeignKey('snapshot_model.id', ondelete='CASCADE'), primary_key=True)
+    season = Column(Integer, nullable=False)
     team_number = Column(Integer, primary_key=True)
     team_name = Column(String(80), nullable=False)
     country = Column(String)
@@ -65,7 +95,9 @@ class TeamModel(db.Model):
     historical_tele_opr = Column(JSON)
     historical_end_opr = Column(JSON)
 
-    def __init__(self, team: Team):
+    def __init__(self, team: Team, season, snapshot_id):
+        self.snapshot_id = snapshot_id
+        self.season = season
         self.update(team)
 
     def update(self, team: Team):
@@ -93,5 +125,221 @@ class TeamModel(db.Model):
         self.historical_tele_opr = jsonify(team.opr_tele_vals).json
         self.historical_end_opr = jsonify(team.opr_end_vals).json
 
+    @staticmethod
+    def search(season, q, limit):
+        """
+        Find teams by number prefix, or by name, city and state/province ranked by trigram similarity
+        :param season: Four digit year representing the season
+        :param q: Search query
+        :param limit: Maximum number of results
+        :return: Rows with the team_search_fields columns
+        """
+        columns = [getattr(TeamModel, field) for field in team_search_fields]
+        query = read_session().query(*columns).filter(TeamModel.snapshot_id == DatasetModel.published_snapshot(season))
+
+        # Team numbers are matched as text so the prefix index can be used
+        if q.isdigit():
+            return (query.filter(cast(TeamModel.team_number, Text).like(q + '%'))
+                    .order_by(TeamModel.team_number).limit(limit).all())
+
+        pattern = '%' + q.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        similarity = db.func.greatest(db.func.similarity(TeamModel.team_name, q),
+                                      db.func.similarity(db.func.coalesce(TeamModel.city, ''), q),
+                                      db.func.similarity(db.func.coalesce(TeamModel.state_province, ''), q))
+        return (query.filter(db.or_(TeamModel.team_name.op('%')(q), TeamModel.city.op('%')(q),
+                                    TeamModel.state_province.op('%')(q), TeamModel.team_name.ilike(pattern)))
+                .order_by(similarity.desc(), TeamModel.team_number).limit(limit).all())
+
+    def to_team(self):
+        """
+        Restore the saved ratings into a team object so calculations can continue from them
+        """
+        team = Team(self.team_number, self.team_name, self.country, self.state_province, self.city, self.home_region)
+        team.games_played = self.games_played
+
+        team.epa_total = self.epa_total
+        team.epa_auto_total = self.auto_epa_total
+        team.epa_tele_total = self.tele_epa_total
+        team.historical_epa = list(self.historical_epa or [])
+        team.historical_auto_epa = list(self.historical_auto_epa or [])
+        team.historical_tele_epa = list(self.historical_tele_epa or [])
+
+        team.opr = self.opr
+        team.opr_auto = self.opr_auto
+        team.opr_tele = self.opr_tele
+        team.opr_end = self.opr_end
+        team.opr_total_vals = list(self.historical_opr or [])
+        team.opr_auto_vals = list(self.historical_auto_opr or [])
+        team.opr_tele_vals = list(self.historical_tele_opr or [])
+        team.opr_end_vals = list(self.historical_end_opr or [])
+        return team
+
+    def __repr__(self):
+        return f"Team(snapshot={self.snapshot_id},season={self.season},number={self.team_number},name={self.team_name})"
+
+event_model_fields = {
+    'snapshot_id': fields.Integer,
+    'season': fields.Integer,
+    'event_code': fields.String,
+    'name': fields.String,
+    'event_type': fields.Integer,
+    'date_start': fields.DateTime(dt_format='iso8601'),
+    'country': fields.String,
+    'state_province': fields.String,
+    'city': fields.String,
+    'region_code': fields.String,
+
+    'team_list': fields.List(fields.Integer),
+    'team_count': fields.Integer,
+    'mean_epa': fields.Float,
+    'top_epa': fields.Float,
+    'strength_of_schedule': fields.Raw
+}
+
+class EventModel(db.Model):
+    """
+    Model used to define the shape of events and their precomputed aggregates in the database with sqlalchemy
+    """
+
+    # General Info
+    snapshot_id = Column(Integer, ForeignKey('snapshot_model.id', ondelete='CASCADE'), primary_key=True)
+    season = Column(Integer, nullable=False)
+    event_code = Column(String, primary_key=True)
+    name = Column(String, nullable=False)
+    event_type = Column(Integer)
+    date_start = Column(DateTime)
+    country = Column(String)
+    state_province = Column(String)
+    city = Column(String)
+    region_code = Column(String)
+
+    # Aggregates
+    team_list = Column(JSON)
+    team_count = Column(Integer)
+    mean_epa = Column(Float)
+    top_epa = Column(Float)
+    strength_of_schedule = Column(JSON)
+
+    # Qualification match numbers reflected in the team ratings of the snapshot, live mode skips these matches
+    match_numbers = Column(JSON)
+
+    def __init__(self, event: 'Event', snapshot_id):
+        self.snapshot_id = snapshot_id
+        self.season = event.season
+        self.event_code = event.event_code
+        self.update(event)
+
+    def update(self, event: 'Event'):
+        self.name = event.name
+        self.event_type = event.event_type
+        self.date_start = event.date_start
+        self.country = event.country
+        self.state_province = event.state_province
+        self.city = event.city
+        self.region_code = event.region_code
+
+        self.team_list = sorted(event.team_list.keys())
+        self.team_count = len(event.team_list)
+        self.mean_epa = event.mean_epa()
+        self.top_epa = event.top_epa()
+        self.strength_of_schedule = jsonify(event.strength_of_schedule()).json
+        self.match_numbers = event.match_numbers()
+
+    def __repr__(self):
+        return f"Event(snapshot={self.snapshot_id},season={self.season},code={self.event_code},name={self.name})"
+
+snapshot_model_fields = {
+    'id': fields.Integer,
+    'season': fields.Integer,
+    'status': fields.String,
+    'created_at': fields.DateTime(dt_format='iso8601'),
+    'published_at': fields.DateTime(dt_format='iso8601')
+}
+
+class SnapshotModel(db.Model):
+    """
+    A complete set of team and event rows written by one update run, readers only see the published snapshot.
+    Live mode updates the published snapshot in place, a snapshot is never written to once it is retired.
+    """
+
+    STAGING = 'staging'
+    PUBLISHED = 'published'
+    RETIRED = 'retired'
+
+    id = Column(Integer, primary_key=True)
+    season = Column(Integer, nullable=False, index=True)
+    status = Column(String, nullable=False)
+    created_at = Column(DateTime(timezone=True))
+    published_at = Column(DateTime(timezone=True))
+
+    def __init__(self, season):
+        self.season = season
+        self.status = SnapshotModel.STAGING
+        self.created_at = datetime.now(timezone.utc)
+
+    @staticmethod
+    def publish(snapshot: 'SnapshotModel'):
+        """
+        Point the season's dataset at a snapshot, readers switch over when the transaction is committed
+        """
+        dataset = DatasetModel.bump(snapshot.season)
+        if dataset.snapshot_id is not None and dataset.snapshot_id != snapshot.id:
+            db.session.get(SnapshotModel, dataset.snapshot_id).status = SnapshotModel.RETIRED
+
+        dataset.snapshot_id = snapshot.id
+        snapshot.status = SnapshotModel.PUBLISHED
+        snapshot.published_at = datetime.now(timezone.utc)
+
+    @staticmethod
+    def prune(season, retention):
+        """
+        Delete all but the most recent snapshots of a season, the published snapshot is always kept
+        :param season: Four digit year representing the season
+        :param retention: Number of snapshots to keep
+        """
+        kept = select(SnapshotModel.id).filter_by(season=season).order_by(SnapshotModel.id.desc()).limit(retention)
+        published = select(DatasetModel.snapshot_id).filter_by(season=season).where(DatasetModel.snapshot_id.isnot(None))
+        # Team and event rows are removed by the database through ON DELETE CASCADE
+        db.session.query(SnapshotModel).filter(SnapshotModel.season == season, SnapshotModel.id.not_in(kept),
+                                               SnapshotModel.id.not_in(published)).delete(synchronize_session=False)
+
+    def __repr__(self):
+        return f"Snapshot(id={self.id},season={self.season},status={self.status})"
+
+class DatasetModel(db.Model):
+    """
+    Published snapshot of a season, and a version increased every time the season's published ratings change
+    """
+
+    season = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    snapshot_id = Column(Integer, ForeignKey('snapshot_model.id'))
+    updated_at = Column(DateTime(timezone=True))
+
+    @staticmethod
+    def bump(season):
+        """
+        Mark the ratings of a season as changed, committed together with the rating changes
+        :return: The dataset of the season
+        """
+        dataset = db.session.get(DatasetModel, season)
+        if not dataset:
+            dataset = DatasetModel(season=season, version=0)
+            db.session.add(dataset)
+        dataset.version += 1
+        dataset.updated_at = datetime.now(timezone.utc)
+        return dataset
+
+    @staticmethod
+    def current_version(season):
+        return read_session().query(DatasetModel.version).filter_by(season=season).scalar() or 0
+
+    @staticmethod
+    def published_snapshot(season):
+        """
+        :return: Subquery of the season's published snapshot id, so rows are filtered in the same statement
+        """
+        return select(DatasetModel.snapshot_id).where(DatasetModel.season == season).scalar_subquery()
+
     def __repr__(self):
-        return f"Team(number={self.team_number},name={self.team_name})"
\ No newline at end of file
+        return f"Dataset(season={self.season},version={self.version},snapshot={self.snapshot_id})"
@@ -1,50 +1,331 @@
-from flask import render_template
-from app import app, db, api
-from app.models import TeamModel, team_model_fields
-from flask_restful import Resource, marshal_with, abort
+import hmac
+import json
+import threading
+import time
 
-from stats.opr_epa import calculate_world_epa_opr
+from flask import Blueprint, current_app, render_template, request, Response, stream_with_context
+from app import db, read_session
+from app.models import TeamModel, EventModel, SnapshotModel, DatasetModel, team_model_fields, team_search_fields, \
+    event_model_fields, snapshot_model_fields
+from flask_restful import Api, Resource, marshal, marshal_with, abort
 
+# The stats package (numpy, requests) is only imported inside the routes that calculate ratings,
+# so serving the read-only API does not pay for it on a cold start
+bp = Blueprint('api', __name__)
+api = Api(bp)
+
+# Live events followed by this process, keyed by (season, event code)
+live_events = {}
+live_events_lock = threading.Lock()
+
+# Team ratings used for predictions, keyed by season and holding (dataset version, TeamRatings)
+rating_cache = {}
+
+
+def requested_season():
+    """
+    :return: The season requested with the season query parameter, defaults to the current season
+    """
+    return request.args.get('season', current_app.config['CURRENT_SEASON'], type=int)
+
+
+def stream_json_list(query, fields):
+    """
+    Stream the rows of a large query as a JSON list, rows are fetched in batches through a server-side cursor
+    :param query: Query to stream
+    :param fields: Flask-RESTful fields used to marshal each row
+    """
+    def generate():
+        yield '['
+        for i, row in enumerate(query.yield_per(current_app.config['READ_BATCH_SIZE'])):
+            yield (',' if i else '') + json.dumps(marshal(row, fields))
+        yield ']'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
 
 class Teams(Resource):
-    @marshal_with(team_model_fields)
     def get(self):
-        teams = TeamModel.query.all()
-        return teams
+        teams = (read_session().query(TeamModel).filter(TeamModel.snapshot_id == DatasetModel.published_snapshot(requested_season()))
+                 .order_by(TeamModel.team_number))
+        return stream_json_list(teams, team_model_fields)
 
 class Team(Resource):
     @marshal_with(team_model_fields)
     def get(self, team_number):
-        team = TeamModel.query.filter_by(team_number=team_number).first()
+        team = (read_session().query(TeamModel).filter_by(team_number=team_number)
+                .filter(TeamModel.snapshot_id == DatasetModel.published_snapshot(requested_season())).first())
         if not team:
             abort(404, message="The requested team was not found. Please try again.")
         return team
 
+class TeamSearch(Resource):
+    @marshal_with(team_search_fields)
+    def get(self):
+        q = request.args.get('q', '').strip()
+        if not q:
+            abort(400, message="A search query is required.")
+        limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+        return TeamModel.search(requested_season(), q, limit)
+
+class Events(Resource):
+    def get(self):
+        events = (read_session().query(EventModel).filter(EventModel.snapshot_id == DatasetModel.published_snapshot(requested_season()))
+                  .order_by(EventModel.date_start))
+        return stream_json_list(events, event_model_fields)
+
+class Event(Resource):
+    @marshal_with(event_model_fields)
+    def get(self, event_code):
+        event = (read_session().query(EventModel).filter_by(event_code=event_code.upper())
+                 .filter(EventModel.snapshot_id == DatasetModel.published_snapshot(requested_season())).first())
+        if not event:
+            abort(404, message="The requested event was not found. Please try again.")
+        return event
+
+class Snapshots(Resource):
+    @marshal_with(snapshot_model_fields)
+    def get(self):
+        snapshots = read_session().query(SnapshotModel).filter_by(season=requested_season()).order_by(SnapshotModel.id.desc())
+        return snapshots.all()
+
+def get_team_ratings(season):
+    """
+    Get the ratings of a season, only read from the database again when the dataset version changed
+    """
+    from stats.predict import RATING_FIELDS, TeamRatings
+
+    version = DatasetModel.current_version(season)
+    cached = rating_cache.get(season)
+    if cached is None or cached[0] != version:
+        columns = [TeamModel.team_number] + [getattr(TeamModel, field) for field in RATING_FIELDS]
+        rows = read_session().query(*columns).filter(TeamModel.snapshot_id == DatasetModel.published_snapshot(season)).all()
+        cached = rating_cache[season] = (version, TeamRatings.from_rows(rows))
+    return cached[1]
+
+class Predict(Resource):
+    def post(self):
+        """
+        Predict a batch of matches, expects {"matches": [{"red": [team, team], "blue": [team, team]}, ...]}
+        """
+        from stats.predict import EPA_COMPONENTS, OPR_COMPONENTS, predict_matches
+
+        body = request.get_json(silent=True)
+        matches = body.get('matches') if isinstance(body, dict) else None
+        if not isinstance(matches, list) or len(matches) == 0:
+            abort(400, message="Expected a list of matches with two red and two blue team numbers.")
+        if len(matches) > current_app.config['PREDICT_MAX_MATCHES']:
+            abort(400, message=f"At most {current_app.config['PREDICT_MAX_MATCHES']} matches can be predicted at once.")
+
+        try:
+            season = int(body.get('season', current_app.config['CURRENT_SEASON']))
+            red_teams = [[int(team) for team in match['red']] for match in matches]
+            blue_teams = [[int(team) for team in match['blue']] for match in matches]
+        except (TypeError, KeyError, ValueError):
+            abort(400, message="Expected a list of matches with two red and two blue team numbers.")
+        if any(len(teams) != 2 for teams in red_teams + blue_teams):
+            abort(400, message="Expected a list of matches with two red and two blue team numbers.")
+
+        try:
+            red, blue, red_win_probability = predict_matches(get_team_ratings(season), red_teams, blue_teams)
+        except KeyError as e:
+            abort(404, message=f"Team {e.args[0]} was not found. Please try again.")
+
+        def alliance_prediction(ratings):
+            return {
+                'epa': {component: float(ratings[i]) for component, i in EPA_COMPONENTS.items()},
+                'opr': {component: float(ratings[i]) for component, i in OPR_COMPONENTS.items()}
+            }
+
+        return {
+            'season': season,
+            'predictions': [{
+                'red': alliance_prediction(red[i]),
+                'blue': alliance_prediction(blue[i]),
+                'red_win_probability': float(red_win_probability[i])
+            } for i in range(len(red_teams))]
+        }
+
 api.add_resource(Teams, '/api/teams/')
 api.add_resource(Team, '/api/teams/<int:team_number>')
+api.add_resource(TeamSearch, '/api/teams/search')
+api.add_resource(Events, '/api/events/')
+api.add_resource(Event, '/api/events/<string:event_code>')
+api.add_resource(Predict, '/api/predict')
+api.add_resource(Snapshots, '/api/snapshots/')
 
-@app.route('/')
+@bp.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/api/cron/update')
+def authorized_cron_request():
+    """
+    :return: Whether the request carries CRON_SECRET as a bearer token, the way Vercel Cron sends it
+    """
+    secret = current_app.config['CRON_SECRET']
+    return bool(secret) and hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {secret}")
+
+@bp.route('/api/cron/update')
 def update():
-    with app.app_context():
-        # Calculate all statistics
-        teams = calculate_world_epa_opr(season=2024)  # calculate_event_epa_opr(create_team_list("USCALAMOS", 2024), season=2024)
-
-        # Loop through all teams and add/update teams
-        with db.session.no_autoflush:
-            for team in teams.values():
-                model_obj = TeamModel(team)
-                query: TeamModel = TeamModel.query.filter_by(team_number=team.team_number).first()
-
-                if not query:
-                    print("Found new team, adding to database.")
-                    db.session.add(model_obj)
-                else:
-                    print("Updating existing team.")
-                    query.update(team)
+    if not authorized_cron_request():
+        abort(401, message="A valid CRON_SECRET is required to update the data.")
+
+    from stats.event import summarize_events
+    from stats.opr_epa import calculate_seasons_epa_opr
+    from stats.seasons import SCORING_ADAPTERS
 
+    # Seasons can be overridden for backfills, e.g. ?seasons=2023,2024
+    seasons = current_app.config['SEASONS']
+    if request.args.get('seasons'):
+        seasons = [season.strip() for season in request.args['seasons'].split(',')]
+        # Checked before any worker process is started
+        if not all(season.isdigit() and int(season) in SCORING_ADAPTERS for season in seasons):
+            abort(400, message=f"Seasons must be a comma separated list of supported seasons: {sorted(SCORING_ADAPTERS)}.")
+        seasons = [int(season) for season in seasons]
+
+    with current_app.app_context():
+        # Calculate all statistics, one process per season
+        season_teams = calculate_seasons_epa_opr(seasons, max_workers=current_app.config['SHARD_WORKERS'])  # calculate_event_epa_opr(create_team_list("USCALAMOS", 2024), season=2024)
+
+        # Write each season into a new snapshot, readers keep seeing the published snapshot meanwhile
+        snapshots = []
+        for season, teams in season_teams.items():
+            snapshot = SnapshotModel(season)
+            db.session.add(snapshot)
+            db.session.flush()  # assigns the snapshot id
+
+            db.session.add_all(TeamModel(team, season, snapshot.id) for team in teams.values())
+            # Store the events with aggregates of the updated teams
+            db.session.add_all(EventModel(event, snapshot.id) for event in summarize_events(season, teams).values())
+            db.session.commit()
+
+            print(f"Staged snapshot {snapshot.id} with {len(teams)} teams for season {season}")
+            snapshots.append(snapshot)
+
+        # Publish every season at once
+        for snapshot in snapshots:
+            SnapshotModel.publish(snapshot)
+        db.session.commit()
+
+        for season in season_teams:
+            SnapshotModel.prune(season, current_app.config['SNAPSHOT_RETENTION'])
         db.session.commit()
-    return '<p>Data successfully updated.</p>'
\ No newline at end of file
+    return '<p>Data successfully updated.</p>'
+
+@bp.route('/api/cron/publish/<int:snapshot_id>', methods=['POST'])
+def publish(snapshot_id):
+    """
+    Publish a kept snapshot again, used to roll back a bad update without recalculating
+    """
+    if not authorized_cron_request():
+        abort(401, message="A valid CRON_SECRET is required to publish a snapshot.")
+
+    snapshot = db.session.get(SnapshotModel, snapshot_id)
+    if not snapshot:
+        abort(404, message="The requested snapshot was not found. Please try again.")
+
+    SnapshotModel.publish(snapshot)
+    db.session.commit()
+    return f'<p>Snapshot {snapshot.id} published for season {snapshot.season}.</p>'
+
+def get_live_event(event_code, season):
+    """
+    Get the live event being followed, starting from the published ratings of the season if it is not followed yet
+    or if another snapshot was published since
+    """
+    from stats.event import validate_event
+    from stats.live import LiveEvent
+
+    key = (season, event_code)
+    snapshot_id = db.session.query(DatasetModel.snapshot_id).filter_by(season=season).scalar()
+    live_event = live_events.get(key)
+    if live_event is not None and live_event.snapshot_id == snapshot_id:
+        return live_event
+
+    event = EventModel.query.filter_by(snapshot_id=snapshot_id, event_code=event_code).first()
+    if event is not None and event.match_numbers is None:
+        abort(409, message="The matches of this event were saved before they were recorded, "
+                           "please wait for the next update.")
+
+    details = validate_event(event_code, season)
+    if details is None:
+        abort(404, message="The requested event was not found. Please try again.")
+
+    models = TeamModel.query.filter_by(snapshot_id=snapshot_id).all()
+    teams = {model.team_number: model.to_team() for model in models}
+    live_event = LiveEvent(event_code, season, teams, applied_matches=event.match_numbers if event else [],
+                           snapshot_id=snapshot_id, poll_interval=current_app.config['LIVE_POLL_INTERVAL'],
+                           roster=details.team_list)
+
+    # The FTC API is only called outside the lock, so other live streams are never held up by it.
+    # Another request may have started following the event meanwhile, the first one to finish is kept.
+    with live_events_lock:
+        current = live_events.get(key)
+        if current is None or current.snapshot_id != snapshot_id:
+            live_events[key] = live_event
+        return live_events[key]
+
+def save_live_teams(live_event, team_numbers):
+    """
+    Save live ratings, and the matches they reflect, into the published snapshot they were read from.
+    The published snapshot is updated in place, retired snapshots are never written to, so a rollback restores
+    a snapshot as it was when it was retired, including the live matches applied while it was published.
+    :return: False if another snapshot was published since, the live event has to start again from it
+    """
+    from stats.event import validate_event
+
+    snapshot_id = db.session.query(DatasetModel.snapshot_id).filter_by(season=live_event.season).scalar()
+    if snapshot_id is None:  # nothing published yet, the next update run will include the event
+        return True
+    if snapshot_id != live_event.snapshot_id:
+        return False
+
+    # The applied matches are saved with the ratings, so a new process never applies them again
+    event = EventModel.query.filter_by(snapshot_id=snapshot_id, event_code=live_event.event_code).first()
+    if not event:
+        details = validate_event(live_event.event_code, live_event.season)
+        if details is None:
+            return True
+        details.team_list = {team_number: live_event.teams[team_number] for team_number in live_event.records.team_numbers}
+        event = EventModel(details, snapshot_id)
+        db.session.add(event)
+    event.match_numbers = sorted(live_event.applied_matches)
+
+    for team_number in team_numbers:
+        team = live_event.teams[team_number]
+        query: TeamModel = TeamModel.query.filter_by(snapshot_id=snapshot_id, team_number=team_number).first()
+        if not query:
+            db.session.add(TeamModel(team, live_event.season, snapshot_id))
+        else:
+            query.update(team)
+    DatasetModel.bump(live_event.season)
+    db.session.commit()
+    return True
+
+@bp.route('/api/live/<event_code>')
+def live(event_code):
+    """
+    Server-Sent Events stream of the ratings of every team at an event, sent again after each posted match
+    """
+    event_code = event_code.upper()
+    season = requested_season()
+    live_event = get_live_event(event_code, season)
+
+    def stream():
+        nonlocal live_event
+        seen_version = -1
+        while True:
+            changed = live_event.poll()
+            if changed and not save_live_teams(live_event, changed):
+                # Continue from the newly published ratings, which may already include the applied matches
+                live_event = get_live_event(event_code, season)
+                seen_version = -1
+                continue
+
+            if live_event.version != seen_version:
+                seen_version = live_event.version
+                yield f"data: {json.dumps(live_event.summary())}\n\n"
+            else:
+                yield ": keep-alive\n\n"
+            time.sleep(live_event.poll_interval)
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
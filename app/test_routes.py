@@ -0,0 +1,103 @@
+import pytest
+from sqlalchemy.schema import CreateTable
+
+from app import create_app, db
+from app.models import TeamModel, EventModel, SnapshotModel, DatasetModel
+from config import Config
+from stats.event import Event
+from stats.team import Team
+
+
+class RoutesConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    SQLALCHEMY_BINDS = {}
+    ENABLE_MIGRATIONS = False
+    READ_BATCH_SIZE = 2  # smaller than the number of rows, so lists are streamed in several batches
+    SEASONS = [2024]
+    CURRENT_SEASON = 2024
+    CRON_SECRET = 'secret'
+
+
+TEAM_NUMBERS = [101, 102, 103, 104, 105]
+EVENT_CODES = ['USCAA', 'USCAB', 'USCAC']
+
+
+@pytest.fixture
+def app():
+    app = create_app(RoutesConfig)
+    with app.app_context():
+        # Tables are created without their indexes, which are specific to PostgreSQL
+        with db.engine.begin() as connection:
+            for model in (SnapshotModel, DatasetModel, TeamModel, EventModel):
+                connection.execute(CreateTable(model.__table__))
+
+        snapshot = SnapshotModel(2024)
+        db.session.add(snapshot)
+        db.session.flush()
+
+        teams = {number: Team(number, f"Team {number}", 'USA', 'CA', 'City', 'USCA') for number in TEAM_NUMBERS}
+        db.session.add_all(TeamModel(team, 2024, snapshot.id) for team in teams.values())
+        for day, event_code in enumerate(EVENT_CODES, start=1):
+            details = {'name': event_code, 'type': 2, 'dateStart': f"2024-10-0{day}T00:00:00", 'country': 'USA',
+                       'stateprov': 'CA', 'city': 'City', 'regionCode': 'USCA'}
+            db.session.add(EventModel(Event(event_code, details, 2024, teams), snapshot.id))
+
+        SnapshotModel.publish(snapshot)
+        db.session.commit()
+        yield app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def test_teams_streams_every_team(client):
+    response = client.get('/api/teams/')
+    assert response.status_code == 200
+    assert [team['team_number'] for team in response.get_json()] == TEAM_NUMBERS
+
+
+def test_events_streams_every_event(client):
+    response = client.get('/api/events/')
+    assert response.status_code == 200
+    assert [event['event_code'] for event in response.get_json()] == EVENT_CODES
+
+
+def test_update_requires_cron_secret(client):
+    assert client.get('/api/cron/update').status_code == 401
+    assert client.get('/api/cron/update', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+
+
+@pytest.mark.parametrize('seasons', ['abc', '2019', '2024,'])
+def test_update_rejects_invalid_seasons(client, seasons):
+    response = client.get(f"/api/cron/update?seasons={seasons}", headers={'Authorization': 'Bearer secret'})
+    assert response.status_code == 400
+
+
+def test_publish_requires_cron_secret(client):
+    assert client.post('/api/cron/publish/1').status_code == 401
+
+
+@pytest.mark.parametrize('body', [[1, 2], 'matches', 5, {'matches': 'abc'}, {'matches': []}])
+def test_predict_rejects_invalid_bodies(client, body):
+    assert client.post('/api/predict', json=body).status_code == 400
+
+
+def test_predict_limits_batch_size(client, app):
+    match = {'red': [101, 102], 'blue': [103, 104]}
+    response = client.post('/api/predict', json={'matches': [match] * (app.config['PREDICT_MAX_MATCHES'] + 1)})
+    assert response.status_code == 400
+
+
+def test_predict(client):
+    response = client.post('/api/predict', json={'matches': [{'red': [101, 102], 'blue': [103, 104]}]})
+    assert response.status_code == 200
+    assert response.get_json()['predictions'][0]['red_win_probability'] == pytest.approx(0.5)
+
+
+def test_live_unknown_event(client, monkeypatch):
+    monkeypatch.setattr('stats.event.validate_event', lambda event_code, season: None)
+    assert client.get('/api/live/NOTANEVENT').status_code == 404
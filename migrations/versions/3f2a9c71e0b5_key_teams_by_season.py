@@ -0,0 +1,33 @@
+"""Key teams by season
+
+Revision ID: 3f2a9c71e0b5
+Revises: d6c1b78df3c4
+Create Date: 2026-10-19 10:12:41.532118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c71e0b5'
+down_revision = 'd6c1b78df3c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows were all calculated for the 2024 season
+    with op.batch_alter_table('team_model', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('season', sa.Integer(), nullable=False, server_default='2024'))
+        batch_op.drop_constraint('team_model_pkey', type_='primary')
+        batch_op.create_primary_key('team_model_pkey', ['season', 'team_number'])
+        batch_op.alter_column('season', server_default=None)
+
+
+def downgrade():
+    op.execute("DELETE FROM team_model WHERE season != 2024")
+    with op.batch_alter_table('team_model', schema=None) as batch_op:
+        batch_op.drop_constraint('team_model_pkey', type_='primary')
+        batch_op.create_primary_key('team_model_pkey', ['team_number'])
+        batch_op.drop_column('season')
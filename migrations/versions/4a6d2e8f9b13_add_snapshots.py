@@ -0,0 +1,94 @@
+"""Add snapshots
+
+Revision ID: 4a6d2e8f9b13
+Revises: e19b7f3c58a0
+Create Date: 2026-10-19 13:36:44.120587
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4a6d2e8f9b13'
+down_revision = 'e19b7f3c58a0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('snapshot_model',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('season', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('published_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('snapshot_model', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_snapshot_model_season'), ['season'], unique=False)
+
+    # Existing rows become the published snapshot of their season
+    op.execute("""
+        INSERT INTO snapshot_model (season, status, created_at, published_at)
+        SELECT season, 'published', now(), now() FROM (
+            SELECT season FROM team_model UNION SELECT season FROM event_model
+        ) AS seasons
+    """)
+    op.execute("""
+        INSERT INTO dataset_model (season, version, updated_at)
+        SELECT season, 0, now() FROM snapshot_model
+        ON CONFLICT (season) DO NOTHING
+    """)
+
+    with op.batch_alter_table('dataset_model', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('snapshot_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('dataset_model_snapshot_id_fkey', 'snapshot_model', ['snapshot_id'], ['id'])
+    op.execute("""
+        UPDATE dataset_model SET snapshot_id = snapshot_model.id, version = dataset_model.version + 1
+        FROM snapshot_model WHERE snapshot_model.season = dataset_model.season
+    """)
+
+    for table in ('team_model', 'event_model'):
+        key = 'team_number' if table == 'team_model' else 'event_code'
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('snapshot_id', sa.Integer(), nullable=True))
+        op.execute(f"UPDATE {table} SET snapshot_id = snapshot_model.id FROM snapshot_model "
+                   f"WHERE snapshot_model.season = {table}.season")
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('snapshot_id', nullable=False)
+            batch_op.create_foreign_key(f'{table}_snapshot_id_fkey', 'snapshot_model', ['snapshot_id'], ['id'],
+                                        ondelete='CASCADE')
+            batch_op.drop_constraint(f'{table}_pkey', type_='primary')
+            batch_op.create_primary_key(f'{table}_pkey', ['snapshot_id', key])
+
+    # Team number prefix searches are now filtered by snapshot instead of season
+    with op.batch_alter_table('team_model', schema=None) as batch_op:
+        batch_op.drop_index('ix_team_model_number_prefix')
+        batch_op.create_index('ix_team_model_number_prefix', ['snapshot_id', sa.text('(team_number::text) text_pattern_ops')], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('team_model', schema=None) as batch_op:
+        batch_op.drop_index('ix_team_model_number_prefix')
+        batch_op.create_index('ix_team_model_number_prefix', ['season', sa.text('(team_number::text) text_pattern_ops')], unique=False)
+
+    # Only the published snapshot of each season is kept
+    for table in ('team_model', 'event_model'):
+        key = 'team_number' if table == 'team_model' else 'event_code'
+        op.execute(f"DELETE FROM {table} WHERE snapshot_id NOT IN "
+                   f"(SELECT snapshot_id FROM dataset_model WHERE snapshot_id IS NOT NULL)")
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_constraint(f'{table}_pkey', type_='primary')
+            batch_op.create_primary_key(f'{table}_pkey', ['season', key])
+            batch_op.drop_constraint(f'{table}_snapshot_id_fkey', type_='foreignkey')
+            batch_op.drop_column('snapshot_id')
+
+    with op.batch_alter_table('dataset_model', schema=None) as batch_op:
+        batch_op.drop_constraint('dataset_model_snapshot_id_fkey', type_='foreignkey')
+        batch_op.drop_column('snapshot_id')
+
+    with op.batch_alter_table('snapshot_model', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_snapshot_model_season'))
+
+    op.drop_table('snapshot_model')
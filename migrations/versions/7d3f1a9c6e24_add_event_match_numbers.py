@@ -0,0 +1,27 @@
+"""Add event match numbers
+
+Revision ID: 7d3f1a9c6e24
+Revises: 4a6d2e8f9b13
+Create Date: 2026-10-19 18:42:17.305921
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d3f1a9c6e24'
+down_revision = '4a6d2e8f9b13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows are left NULL, the next update run records the matches of every event
+    with op.batch_alter_table('event_model', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('match_numbers', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('event_model', schema=None) as batch_op:
+        batch_op.drop_column('match_numbers')
@@ -0,0 +1,33 @@
+"""Add team search indexes
+
+Revision ID: e19b7f3c58a0
+Revises: c5e07a93d1f4
+Create Date: 2026-10-19 12:21:05.883914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e19b7f3c58a0'
+down_revision = 'c5e07a93d1f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    with op.batch_alter_table('team_model', schema=None) as batch_op:
+        batch_op.create_index('ix_team_model_number_prefix', ['season', sa.text('(team_number::text) text_pattern_ops')], unique=False)
+        batch_op.create_index('ix_team_model_team_name_trgm', ['team_name'], unique=False, postgresql_using='gin', postgresql_ops={'team_name': 'gin_trgm_ops'})
+        batch_op.create_index('ix_team_model_city_trgm', ['city'], unique=False, postgresql_using='gin', postgresql_ops={'city': 'gin_trgm_ops'})
+        batch_op.create_index('ix_team_model_state_province_trgm', ['state_province'], unique=False, postgresql_using='gin', postgresql_ops={'state_province': 'gin_trgm_ops'})
+
+
+def downgrade():
+    with op.batch_alter_table('team_model', schema=None) as batch_op:
+        batch_op.drop_index('ix_team_model_state_province_trgm', postgresql_using='gin')
+        batch_op.drop_index('ix_team_model_city_trgm', postgresql_using='gin')
+        batch_op.drop_index('ix_team_model_team_name_trgm', postgresql_using='gin')
+        batch_op.drop_index('ix_team_model_number_prefix')
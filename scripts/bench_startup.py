@@ -0,0 +1,60 @@
+"""
+Startup benchmark, reports how long each module takes to import on a cold start.
+
+Usage: python scripts/bench_startup.py [statement] [--top N]
+The statement defaults to creating the app the way Vercel does (`import run`).
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules which should only be imported by the routes that calculate ratings
+HEAVY_MODULES = ['numpy', 'requests', 'tkinter', 'alembic', 'flask_migrate', 'stats.opr_epa']
+
+
+def measure_imports(statement):
+    """
+    Run the statement in a fresh interpreter with -X importtime
+    :param statement: Python statement to run
+    :return: List of (module, self time in µs, cumulative time in µs) in import order
+    """
+    env = dict(os.environ, VERCEL='1')  # import the app as it is deployed
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement], cwd=ROOT, env=env,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        sys.exit(result.stderr)
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_time, cumulative, module = line[len('import time:'):].split('|')
+        imports.append((module.strip(), int(self_time), int(cumulative)))
+    return imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('statement', nargs='?', default='import run')
+    parser.add_argument('--top', type=int, default=25, help='number of modules to report')
+    args = parser.parse_args()
+
+    imports = measure_imports(args.statement)
+    total = sum(self_time for _, self_time, _ in imports)
+
+    print(f"{args.statement!r}: {len(imports)} modules, {total / 1000:.1f} ms\n")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for module, self_time, cumulative in sorted(imports, key=lambda i: i[2], reverse=True)[:args.top]:
+        print(f"{cumulative / 1000:>14.1f} {self_time / 1000:>9.1f}  {module}")
+
+    imported = {module for module, _, _ in imports}
+    heavy = [module for module in HEAVY_MODULES if module in imported]
+    if heavy:
+        print(f"\nHeavy modules imported on startup: {', '.join(heavy)}")
+
+
+if __name__ == '__main__':
+    main()
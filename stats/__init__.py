@@ -1,5 +1,12 @@
-import stats.event as event
-import stats.opr_epa as opr_epa
-import stats.team as team
-import stats.export as export
-import stats.data as data
\ No newline at end of file
+import importlib
+
+# Submodules are imported on first use, so importing a light module such as stats.team
+# does not load numpy, requests or tkinter
+__all__ = ['event', 'opr_epa', 'team', 'export', 'data', 'pipeline', 'seasons', 'shards', 'opr_accumulator',
+           'live', 'predict', 'parameters', 'backtest', 'store']
+
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
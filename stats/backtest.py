@@ -0,0 +1,180 @@
+"""
+Replay a recorded season under many EPA parameter sets at once and report the prediction error of each.
+
+Usage: python -m stats.backtest SEASON [--k-start 0.3,0.33] [--k-end 0.15,0.2] [--k-decay-games 45] [--margin 0,1]
+"""
+import argparse
+import itertools
+from datetime import datetime
+
+import numpy as np
+
+from stats.event import get_all_events
+from stats.parameters import EpaParameters
+from stats.pipeline import RED, BLUE
+from stats.predict import win_probability, win_probability_scale
+from stats.store import cached_event_matches
+
+
+def record_season(events, season, match_stream=None):
+    """
+    Record the matches of a season so they can be replayed any number of times
+    :param events: List of (event start date, event code) objects sorted from earliest to latest
+    :param season: Four digit year representing the season
+    :param match_stream: (OPTIONAL) Iterable of MatchRecords matching events, read from the cache by default
+    :return: List of (event start date, MatchRecords) objects
+    """
+    if match_stream is None:
+        match_stream = cached_event_matches(events, season)
+    return [(event[0], records) for event, records in zip(events, match_stream)]
+
+
+class ParameterGrid:
+    """
+    Parameter sets stored as one array per parameter, so every set is updated in the same NumPy operation
+    """
+
+    def __init__(self, parameter_sets):
+        """
+        :param parameter_sets: List of EpaParameters
+        """
+        self.parameter_sets = list(parameter_sets)
+        for name in ('k_start', 'k_end', 'k_decay_games', 'k_decay_start', 'k_decay_end', 'margin_start', 'margin_end'):
+            setattr(self, name, np.array([getattr(parameters, name) for parameters in self.parameter_sets], dtype=float))
+        self.margin = np.array([parameters.margin for parameters in self.parameter_sets])
+
+    def __len__(self):
+        return len(self.parameter_sets)
+
+    def schedule(self, games_played):
+        """
+        Vectorized EpaParameters.schedule
+        :param games_played: Average games played by the four teams of a match
+        :return: m and k arrays with one value per parameter set
+        """
+        k = np.where(games_played <= self.k_decay_start, self.k_start,
+                     np.where(games_played <= self.k_decay_end,
+                              self.k_start - (games_played - self.k_decay_start) / self.k_decay_games, self.k_end))
+        m = np.where(self.margin & (games_played > self.margin_start),
+                     np.minimum((games_played - self.margin_start) / (self.margin_end - self.margin_start), 1), 0)
+        return m, k
+
+
+def season_baselines(recorded_season, grid: ParameterGrid):
+    """
+    Starting total EPA of each parameter set, the average alliance score of its baseline months divided by two
+    :return: Array with one starting EPA per parameter set
+    """
+    months = np.array([datetime.fromisoformat(date).month for date, _ in recorded_season])
+    totals = [records.scores[:, :, 0] for _, records in recorded_season]
+
+    baselines = np.zeros(len(grid))
+    for i, parameters in enumerate(grid.parameter_sets):
+        early = [total for total, month in zip(totals, months) if month in parameters.baseline_months]
+        scores = np.concatenate([total.reshape(-1) for total in early]) if early else np.zeros(0)
+        baselines[i] = scores.mean() / 2 if len(scores) else 0
+    return baselines
+
+
+def backtest(recorded_season, parameter_sets):
+    """
+    Replay a season once, updating total EPA for every parameter set in parallel and scoring the prediction made
+    before each match. The EPA state is a (teams, parameter sets) matrix, one column per parameter set.
+    Win probabilities are calculated the way /api/predict serves them, from the ratings before each event.
+    :param recorded_season: List of (event start date, MatchRecords) objects, see record_season
+    :param parameter_sets: List of EpaParameters to evaluate
+    :return: List of dictionaries with the parameters, mse and brier score of each set, best mse first
+    """
+    grid = ParameterGrid(parameter_sets)
+    baselines = season_baselines(recorded_season, grid)
+
+    team_rows = {}
+    for _, records in recorded_season:
+        for team_number in records.team_numbers:
+            team_rows.setdefault(team_number, len(team_rows))
+
+    epa = np.zeros((len(team_rows), len(grid)))
+    games_played = np.zeros(len(team_rows))
+    seen = np.zeros(len(team_rows), dtype=bool)
+
+    squared_error = np.zeros(len(grid))
+    brier = np.zeros(len(grid))
+    matches = 0
+
+    for _, records in recorded_season:
+        rows = np.array([team_rows[team_number] for team_number in records.team_numbers], dtype=np.int64)
+
+        # Predictions only use teams rated before the event, as the published ratings would
+        scale = win_probability_scale(epa[seen])
+
+        # Teams seen for the first time start from the baseline, counted as one game like the full calculation
+        new = rows[~seen[rows]]
+        epa[new] = baselines
+        games_played[new] = 1
+        seen[new] = True
+
+        for alliances, scores in zip(records.alliances, records.scores):
+            red = rows[alliances[RED]]
+            blue = rows[alliances[BLUE]]
+            red_score = scores[RED, 0]
+            blue_score = scores[BLUE, 0]
+
+            red_epa = epa[red].sum(axis=0)
+            blue_epa = epa[blue].sum(axis=0)
+
+            # Score the prediction made before the match
+            squared_error += (red_epa - red_score) ** 2 + (blue_epa - blue_score) ** 2
+            red_win_probability = win_probability(red_epa, blue_epa, scale)
+            outcome = 1.0 if red_score > blue_score else 0.5 if red_score == blue_score else 0.0
+            brier += (red_win_probability - outcome) ** 2
+            matches += 1
+
+            m, k = grid.schedule(games_played[np.concatenate((red, blue))].mean())
+            delta_red = k / (1 + m) * ((red_score - red_epa) - m * (blue_score - blue_epa))
+            delta_blue = k / (1 + m) * ((blue_score - blue_epa) - m * (red_score - red_epa))
+
+            epa[red] += delta_red
+            epa[blue] += delta_blue
+            games_played[red] += 1
+            games_played[blue] += 1
+
+    results = [{
+        'parameters': parameters,
+        'mse': squared_error[i] / max(2 * matches, 1),
+        'brier': brier[i] / max(matches, 1)
+    } for i, parameters in enumerate(grid.parameter_sets)]
+    return sorted(results, key=lambda result: result['mse'])
+
+
+def parameter_grid(**values):
+    """
+    Every combination of the given parameter values
+    :param values: Lists of values keyed by EpaParameters argument name
+    :return: List of EpaParameters
+    """
+    names = list(values)
+    return [EpaParameters(**dict(zip(names, combination))) for combination in itertools.product(*values.values())]
+
+
+def main():
+    def floats(value):
+        return [float(v) for v in value.split(',')]
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('season', type=int)
+    parser.add_argument('--k-start', type=floats, default=[0.33])
+    parser.add_argument('--k-end', type=floats, default=[0.2])
+    parser.add_argument('--k-decay-games', type=floats, default=[45])
+    parser.add_argument('--margin', type=lambda value: [v == '1' for v in value.split(',')], default=[False])
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    recorded_season = record_season(get_all_events(args.season), args.season)
+    grid = parameter_grid(k_start=args.k_start, k_end=args.k_end, k_decay_games=args.k_decay_games, margin=args.margin)
+
+    for result in backtest(recorded_season, grid)[:args.top]:
+        print(f"mse={result['mse']:.2f} brier={result['brier']:.4f} {result['parameters']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -11,3 +11,14 @@ def get_auth():
     """
     load_dotenv()
     return os.getenv("API_USER"), os.getenv("API_TOKEN")
+
+
+def get_cache_dir():
+    """
+    Get the directory of the normalized season cache from environment variables
+
+    :return
+        The cache directory, or None when caching is disabled
+    """
+    load_dotenv()
+    return os.getenv("STATS_CACHE_DIR") or None
@@ -56,11 +56,13 @@ def validate_event(event_code, season) -> Event | None:
   event_response = requests.get(f"http://ftc-api.firstinspires.org/v2.0/{season}/events?eventCode="+event_code,
                                 auth=get_auth())
 
-  if event_response.status_code == 404: # Return false if 404 not found
+  if event_response.status_code != 200: # Return false if not found or the code is malformed
     return None
 
-  event = event_response.json()['events'][0]
-  return Event(event_code, event, season)
+  events = event_response.json().get('events')
+  if not events:
+    return None
+  return Event(event_code, events[0], season)
 
 def get_all_events_by_teams(teams: List[str], season):
   """
@@ -99,9 +101,19 @@ def get_all_events_by_teams(teams: List[str], season):
   return combined
 
 
-def get_all_events(region_code:str=""):
+def fetch_events(season):
+  """
+  Retrieve every event of a season
+  :param season: Four digit year representing the season
+  :return: JSON list of events
+  """
+  event_response = requests.get(f"http://ftc-api.firstinspires.org/v2.0/{season}/events", auth=get_auth())
+  return event_response.json().get('events', [])
+
+def get_all_events(season, region_code:str=""):
   """
   Get all events
+  :param season: Four digit year representing the season
   :param region_code: OPTIONAL region code to filter by
   :return: A list of objects containing the start date and event code of all events sorted from earliest to latest
   """
@@ -113,8 +125,7 @@ def get_all_events(region_code:str=""):
   # 17 = Premier
   valid_event = [1, 2, 3, 4, 6, 7, 17]
 
-  event_response = requests.get("http://ftc-api.firstinspires.org/v2.0/2024/events", auth=get_auth())
-  events = event_response.json().get('events', [])
+  events = fetch_events(season)
 
   event_codes = []
   event_date = []
@@ -136,18 +147,64 @@ def get_all_events(region_code:str=""):
 
 class Event:
 
-  def __init__(self, event_code, event, season):
+  def __init__(self, event_code, event, season, team_list=None):
     """
     :param event_code: FTC Event Code
     :param event: JSON response from FTC API for that event
     :param season: Valid season
+    :param team_list: OPTIONAL dictionary of team objects at the event, retrieved from the FTC API if not given
     """
     self.event_code = event_code
+    self.season = season
     self.name = event['name']
+    self.event_type = int(event['type'])
+    self.date_start = datetime.fromisoformat(event['dateStart'])
 
     # Location Info
     self.country = event['country']
     self.state_province = event['stateprov']
     self.city = event['city']
+    self.region_code = event.get('regionCode')
+
+    self.team_list = team_list if team_list is not None else create_team_list(event_code, season)
+
+  def mean_epa(self):
+    epas = [team.epa_total for team in self.team_list.values()]
+    return sum(epas) / len(epas) if epas else None
+
+  def top_epa(self):
+    return max((team.epa_total for team in self.team_list.values()), default=None)
+
+  def strength_of_schedule(self):
+    """
+    :return: Dictionary of team number to the average EPA of the opposing alliances the team faced in qualifiers
+    """
+    schedule = {}
+    for team_number, team in self.team_list.items():
+      opponent_epa = team.opponent_epa.get(self.event_code, [])
+      if opponent_epa:
+        schedule[team_number] = sum(opponent_epa) / len(opponent_epa)
+    return schedule
+
+  def match_numbers(self):
+    """
+    :return: Sorted qualification match numbers of the event reflected in the teams' ratings
+    """
+    return sorted({match_number for team in self.team_list.values() for match_number in team.matches.get(self.event_code, [])})
+
+def summarize_events(season, all_teams):
+  """
+  Build an event object for every event attended by the given teams, using the teams' calculated statistics
+  :param season: Four digit year representing the season
+  :param all_teams: Dictionary of team objects with updated statistics
+  :return: Dictionary of event code to event objects
+  """
+  details = {event['code']: event for event in fetch_events(season)}
+
+  rosters = {}
+  for team in all_teams.values():
+    for event_code in team.events:
+      rosters.setdefault(event_code, {})[team.team_number] = team
 
-    self.team_list = create_team_list(event_code, season)
\ No newline at end of file
+  return {event_code: Event(event_code, details[event_code], season, team_list)
+          for event_code, team_list in rosters.items() if event_code in details}
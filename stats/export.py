@@ -1,6 +1,5 @@
 # Convert to json file for JavaScript
 import json
-import tkinter.messagebox
 import traceback
 
 from stats.event import Event
@@ -51,6 +50,7 @@ def save_event_data(events, path):
                 json.dump(data, f, indent=2)
         except Exception as e:
             traceback.print_exception(type(e), e, e.__traceback__)
+            import tkinter.messagebox  # only needed by the desktop app, and not available on every platform
             tkinter.messagebox.showerror(title="Export to JSON (Events)", message="Something went wrong while saving the file")
 
 def save_team_data(teams, path):
@@ -64,4 +64,5 @@ def save_team_data(teams, path):
                 json.dump(data, f, indent=2)
         except Exception as e:
             traceback.print_exception(type(e), e, e.__traceback__)
+            import tkinter.messagebox
             tkinter.messagebox.showerror(title="Export to JSON", message="Something went wrong while saving the file")
\ No newline at end of file
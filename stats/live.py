@@ -0,0 +1,167 @@
+import threading
+import time
+
+import numpy as np
+import requests
+
+from stats.data import get_auth
+from stats.event import create_team_list
+from stats.opr_accumulator import OprAccumulator
+from stats.opr_epa import apply_epa, register_teams
+from stats.pipeline import EventPayload, MatchRecords, normalize_event
+from stats.team import Team
+
+
+def start_averages_from(teams):
+    """
+    Recover the season starting averages from saved teams, every team starts its history at those averages
+    :param teams: Dictionary of saved team objects
+    :return: Average total score, average auto score, average teleop score
+    """
+    for team in teams.values():
+        if team.historical_epa and team.historical_auto_epa and team.historical_tele_epa:
+            return team.historical_epa[0], team.historical_auto_epa[0], team.historical_tele_epa[0]
+    return 0, 0, 0
+
+
+class LiveEvent:
+    """
+    Applies the matches of an active event to saved ratings as soon as they are posted
+    """
+
+    def __init__(self, event_code, season, teams, applied_matches=(), snapshot_id=None, poll_interval=10, roster=None):
+        """
+        :param event_code: FIRST Event Code
+        :param season: Four digit year representing the season
+        :param teams: Dictionary of saved team objects, at least the teams at the event
+        :param applied_matches: (OPTIONAL) Qualification match numbers already reflected in the saved ratings
+        :param snapshot_id: (OPTIONAL) Id of the snapshot the saved ratings were read from
+        :param poll_interval: Minimum number of seconds between two requests to the FTC API
+        :param roster: (OPTIONAL) Dictionary of team objects at the event from create_team_list, retrieved if not given
+        """
+        self.event_code = event_code
+        self.season = season
+        self.snapshot_id = snapshot_id
+        self.poll_interval = poll_interval
+
+        self.roster = roster if roster is not None else create_team_list(event_code, season)
+        self.teams = teams
+
+        # Teams without saved ratings start from the season averages, same as the full calculation
+        start_averages = start_averages_from(teams)
+        self.records = MatchRecords(event_code, self.roster, [team.team_number for team in self.roster.values()],
+                                    np.zeros((0, 2, 2), dtype=np.int32), np.zeros((0, 2, 4)))
+        register_teams(self.teams, self.records, *start_averages)
+        self.opr = OprAccumulator(len(self.records.team_numbers))
+
+        # Matches reflected in EPA, including those saved before this process started, and matches added to the OPR.
+        # The OPR is solved from every match of the event, so saved matches are added to it again but not to EPA.
+        self.applied_matches = set(applied_matches)
+        self.solved_matches = set()
+        self.opr_saved = len(self.applied_matches) > 0  # the saved ratings already hold an OPR for this event
+
+        self.modified_since = None  # Last-Modified of the previous matches response
+        self.last_poll = 0
+        self.version = 0  # increased every time new matches are applied
+        self.lock = threading.Lock()
+
+    def fetch_new_matches(self):
+        """
+        Retrieve the qualification matches posted since the previous request
+        :return: A tuple of the new matches and their scores, in match order
+        """
+        headers = {'If-Modified-Since': self.modified_since} if self.modified_since else {}
+        response = requests.get(
+            f"http://ftc-api.firstinspires.org/v2.0/{self.season}/matches/" + self.event_code + "?tournamentLevel=qual",
+            auth=get_auth(), headers=headers)
+        if response.status_code == 304:  # Nothing posted since the last request
+            return [], []
+        last_modified = response.headers.get('Last-Modified', self.modified_since)
+
+        matches = [match for match in response.json()['matches'] if match['matchNumber'] not in self.solved_matches]
+        if len(matches) == 0:
+            self.modified_since = last_modified
+            return [], []
+
+        score_response = requests.get(
+            f"https://ftc-api.firstinspires.org/v2.0/{self.season}/scores/" + self.event_code + "/qual",
+            params={'start': min(match['matchNumber'] for match in matches)}, auth=get_auth())
+        scores = {score['matchNumber']: score for score in score_response.json()['matchScores']}
+
+        # The cursor only moves once every posted match has its detailed scores, otherwise the matches still
+        # missing them would be hidden behind 304 responses and never requested again
+        if all(match['matchNumber'] in scores for match in matches):
+            self.modified_since = last_modified
+
+        # Only keep matches whose detailed scores have been posted as well
+        matches = sorted((match for match in matches if match['matchNumber'] in scores), key=lambda m: m['matchNumber'])
+        return matches, [scores[match['matchNumber']] for match in matches]
+
+    def poll(self):
+        """
+        Apply any newly posted matches, requests are rate limited to one every poll_interval seconds
+        :return: The team numbers whose ratings changed
+        """
+        with self.lock:
+            if time.monotonic() - self.last_poll < self.poll_interval:
+                return []
+            self.last_poll = time.monotonic()
+
+            matches, scores = self.fetch_new_matches()
+            if len(matches) == 0:
+                return []
+
+            new_records = normalize_event(EventPayload(self.event_code, self.season, self.roster, matches, scores))
+            self.opr.add_records(new_records)
+            self.solved_matches.update(new_records.match_numbers)
+            self.solve_opr()
+
+            # Matches already reflected in the saved ratings only contribute to the OPR
+            unapplied = [i for i, match_number in enumerate(new_records.match_numbers)
+                         if match_number not in self.applied_matches]
+            if len(unapplied) == 0:
+                return []
+
+            apply_epa(MatchRecords(self.event_code, self.roster, new_records.team_numbers, new_records.alliances[unapplied],
+                                   new_records.scores[unapplied], [new_records.match_numbers[i] for i in unapplied]),
+                      self.teams)
+            self.applied_matches.update(new_records.match_numbers)
+
+            self.version += 1
+            print(f"Applied {len(unapplied)} new matches from {self.event_code}")
+            return list(self.records.team_numbers)
+
+    def solve_opr(self):
+        """
+        Update the OPR of the event with every match added so far, replacing this event's previous OPR
+        """
+        oprs = self.opr.solve()
+        for i, team_number in enumerate(self.records.team_numbers):
+            self.teams[team_number].revise_opr(oprs[i, 0], oprs[i, 1], oprs[i, 2], oprs[i, 3], replace=self.opr_saved)
+        self.opr_saved = True
+
+    def summary(self):
+        """
+        :return: JSON friendly ratings of every team at the event
+        """
+        return {
+            'event_code': self.event_code,
+            'season': self.season,
+            'version': self.version,
+            'matches_played': len(self.applied_matches),
+            'teams': [live_team_fields(self.teams[team_number]) for team_number in self.records.team_numbers]
+        }
+
+
+def live_team_fields(team: Team):
+    return {
+        'team_number': team.team_number,
+        'games_played': team.games_played,
+        'epa_total': float(team.epa_total),
+        'auto_epa_total': float(team.epa_auto_total),
+        'tele_epa_total': float(team.epa_tele_total),
+        'opr': float(team.opr),
+        'opr_auto': float(team.opr_auto),
+        'opr_tele': float(team.opr_tele),
+        'opr_end': float(team.opr_end)
+    }
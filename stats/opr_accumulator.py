@@ -0,0 +1,66 @@
+import numpy as np
+
+from stats.pipeline import RED, BLUE, SCORE_COMPONENTS
+
+
+class OprAccumulator:
+    """
+    Keeps the normal equations (AᵀA x = Aᵀb) of an event's OPR so the OPR can be updated one alliance at a time.
+
+    Once AᵀA has full rank its inverse is kept up to date with Sherman–Morrison rank-one updates, making each
+    new alliance and each new solution O(n²) in the number of teams. Until then every solution falls back to a
+    full least squares solve of the normal equations, which matches np.linalg.lstsq on the game matrix.
+    """
+
+    def __init__(self, team_count):
+        """
+        :param team_count: Number of teams at the event, alliances refer to teams by their index
+        """
+        self.ata = np.zeros((team_count, team_count))
+        self.atb = np.zeros((team_count, len(SCORE_COMPONENTS)))
+        self.inverse = None  # (AᵀA)⁻¹, only once AᵀA has full rank
+        self.rows = 0
+
+    def add_alliance(self, team_indices, scores):
+        """
+        Add one row of the game matrix
+        :param team_indices: Indices of the teams on the alliance
+        :param scores: Score components of the alliance, see SCORE_COMPONENTS
+        """
+        team_indices = np.asarray(team_indices)
+        self.ata[np.ix_(team_indices, team_indices)] += 1
+        self.atb[team_indices] += scores
+        self.rows += 1
+
+        if self.inverse is not None:
+            # (M + aaᵀ)⁻¹ = M⁻¹ - (M⁻¹a)(M⁻¹a)ᵀ / (1 + aᵀM⁻¹a), a is the 0/1 alliance row so M⁻¹a is a column sum
+            inverse_a = self.inverse[:, team_indices].sum(axis=1)
+            self.inverse -= np.outer(inverse_a, inverse_a) / (1 + inverse_a[team_indices].sum())
+
+    def add_match(self, alliances, scores):
+        """
+        Add both alliances of a match
+        :param alliances: Team indices of shape (2, 2), as stored in MatchRecords.alliances
+        :param scores: Score components of shape (2, 4), as stored in MatchRecords.scores
+        """
+        self.add_alliance(alliances[RED], scores[RED])
+        self.add_alliance(alliances[BLUE], scores[BLUE])
+
+    def add_records(self, records):
+        """
+        Add every match of a MatchRecords object
+        """
+        for alliances, scores in zip(records.alliances, records.scores):
+            self.add_match(alliances, scores)
+
+    def solve(self):
+        """
+        :return: Array of shape (teams, 4) with the OPR of every team for each score component
+        """
+        if self.inverse is None and self.rows >= len(self.ata) and np.linalg.matrix_rank(self.ata) == len(self.ata):
+            self.inverse = np.linalg.inv(self.ata)
+
+        if self.inverse is None:  # rank deficient, not every team can be separated yet
+            return np.linalg.lstsq(self.ata, self.atb, rcond=None)[0]
+
+        return self.inverse @ self.atb
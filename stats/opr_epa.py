@@ -1,10 +1,15 @@
-import requests
-
-from stats.data import get_auth
-from stats.event import create_team_list, get_all_events, get_all_events_by_teams
+from stats.data import get_cache_dir
+from stats.event import get_all_events, get_all_events_by_teams
+from stats.parameters import EpaParameters, DEFAULT_EPA_PARAMETERS
+from stats.pipeline import MatchRecords, RED, BLUE, fetch_matches, fetch_scores, score_components
+from stats.shards import shard_events
+from stats.store import cached_event_matches
 from stats.team import Team
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from datetime import datetime
 import numpy as np
+import os
 
 
 def create_game_matrix(event_code, team_list, season):
@@ -16,9 +21,7 @@ def create_game_matrix(event_code, team_list, season):
     :return: The game matrix
     """
 
-    response = requests.get(
-        f"http://ftc-api.firstinspires.org/v2.0/{season}/matches/" + event_code + "?tournamentLevel=qual", auth=get_auth())
-    matches = response.json()['matches']  # only grab from qualifiers to equally compare all teams
+    matches = fetch_matches(event_code, season)
 
     game_matrix = []
 
@@ -50,10 +53,7 @@ def obtain_score_data(event_code, season):
     :return: A tuple of each score component: total score, auto score, teleop score and endgame score
     """
 
-    # Pulling a request for the scores with different parameters
-    response = requests.get(f"https://ftc-api.firstinspires.org/v2.0/{season}/scores/" + event_code + "/qual",
-                            auth=get_auth())  # only grab from qualifiers to equally compare all teams
-    score_data = response.json()['matchScores']
+    score_data = fetch_scores(event_code, season)
 
     auto_score = []
     teleop_score = []
@@ -61,35 +61,40 @@ def obtain_score_data(event_code, season):
     total_score = []
 
     for match_score in score_data:
-        red_alliance = match_score['alliances'][1]
-        blue_alliance = match_score['alliances'][0]
-
-        # Add red alliance
-        total_score.append(red_alliance['preFoulTotal'])
-        auto_score.append(red_alliance['autoPoints'])
-        teleop_sample_spec = red_alliance['teleopSamplePoints'] + red_alliance[
-            'teleopSpecimenPoints']
-        teleop_score.append(teleop_sample_spec)
+        # Add red alliance, then blue alliance
+        for alliance in (match_score['alliances'][1], match_score['alliances'][0]):
+            total, auto, teleop, endgame = score_components(alliance, season)
+            total_score.append(total)
+            auto_score.append(auto)
+            teleop_score.append(teleop)
+            endgame_score.append(endgame)
 
-        endgame_score.append(red_alliance['teleopPoints'] - teleop_sample_spec)
+    return total_score, auto_score, teleop_score, endgame_score
 
-        # Then blue alliance
-        total_score.append(blue_alliance['preFoulTotal'])
-        auto_score.append(blue_alliance['autoPoints'])
-        teleop_sample_spec = blue_alliance['teleopSamplePoints'] + blue_alliance[
-            'teleopSpecimenPoints']
-        teleop_score.append(teleop_sample_spec)
 
-        endgame_score.append(blue_alliance['teleopPoints'] - teleop_sample_spec)
+def early_score_matrices(events, season):
+    """
+    Score components of every alliance at each event, read from the season cache when STATS_CACHE_DIR is set
+    :param season: Valid four digits representing the year of the game
+    :param events: List of (event date, event code) objects
+    :return: A generator of arrays of shape (alliances, 4), one per event, see SCORE_COMPONENTS
+    """
+    if get_cache_dir():
+        # Events missing from the cache are cached here, so the rating calculation that follows reads them too
+        for records in cached_event_matches(events, season):
+            yield records.score_matrix()
+        return
 
-    return total_score, auto_score, teleop_score, endgame_score
+    for event in events:
+        yield np.array(obtain_score_data(event[1], season), dtype=float).T
 
 
-def calculate_start_avg(events, season):
+def calculate_start_avg(events, season, baseline_months=DEFAULT_EPA_PARAMETERS.baseline_months):
     """
     Calculates the start of the season average for use in EPA calculations
     :param season: Valid four digits representing the year of the game
     :param events: List of (event date, event code) objects to consider
+    :param baseline_months: (OPTIONAL) Months of the events used for the averages
     :return: Average total score, average auto score, average teleop score
     """
     first_events = []
@@ -99,19 +104,18 @@ def calculate_start_avg(events, season):
         event_code = event[1]
 
         date = datetime.fromisoformat(iso_date)
-        if date.month == 11 or date.month == 10:  # Find events in October (10) or November (11)
+        if date.month in baseline_months:  # Find events early in the season, October (10) or November (11) by default
             print(f"Found early event (${event_code})")
-            first_events.append(event_code)
+            first_events.append(event)
 
     num_games = avg_total = avg_auto = avg_teleop = 0
     # Find the averages in the first number of events
-    for event in first_events:
+    for score_matrix in early_score_matrices(first_events, season):
         print(f"Parsing event scores from early event")
-        event_total_scores, event_auto_scores, event_tele_scores, event_end_scorse = obtain_score_data(event, season)
-        num_games += len(event_total_scores)
-        avg_total += sum(event_total_scores)
-        avg_auto += sum(event_auto_scores)
-        avg_teleop += sum(event_tele_scores)
+        num_games += len(score_matrix)
+        avg_total += float(score_matrix[:, 0].sum())
+        avg_auto += float(score_matrix[:, 1].sum())
+        avg_teleop += float(score_matrix[:, 2].sum())
 
     avg_total /= num_games
     avg_total /= 2
@@ -125,19 +129,20 @@ def calculate_start_avg(events, season):
     print(f"Average Total: {avg_total}, Average Auto: {avg_auto}, Average TeleOP: {avg_teleop}")
     return avg_total, avg_auto, avg_teleop
 
-def calculate_event_epa_opr(teams, season, region_code=""):
+def calculate_event_epa_opr(teams, season, region_code="", epa_parameters=DEFAULT_EPA_PARAMETERS):
     """
     Calculate and update epa and opr for all teams at a specified event
     :param season: Four digit year representing the season
     :param teams: List of teams participating at the event
     :param region_code: Optional, region code used to determine starting averages for EPA
+    :param epa_parameters: Optional, parameters of the EPA model
     :return: A list of all teams who have participated in an event with updated statistics
     """
 
     events = get_all_events_by_teams(teams, season) # Get all events that the teams have participated in
 
 
-    all_teams = calculate_all_epa_opr(events, season, region_code) # Calculate relevant epa/opr for all teams in those events
+    all_teams = calculate_all_epa_opr(events, season, region_code, epa_parameters=epa_parameters) # Calculate relevant epa/opr for all teams in those events
 
 
 
@@ -147,112 +152,234 @@ def calculate_event_epa_opr(teams, season, region_code=""):
     print("Calculations complete!")
     return event_teams
 
-def calculate_world_epa_opr(season, region_code=""):
+def calculate_world_epa_opr(season, region_code="", epa_parameters=DEFAULT_EPA_PARAMETERS, max_workers=None):
     all_teams: dict[str, Team]
-    all_events = get_all_events()
-    all_teams = calculate_all_epa_opr(all_events, season, region_code)
+    all_events = get_all_events(season)
+    all_teams = calculate_sharded_epa_opr(all_events, season, region_code, max_workers, epa_parameters)
 
     print("Calculations complete!")
     return all_teams
 
-def calculate_all_epa_opr(events, season, region_code=""):
+def process_pool(max_workers):
+    """
+    Create a process pool, calculations run serially when processes are unavailable
+    :param max_workers: Number of processes, None for the number of CPUs
+    :return: A ProcessPoolExecutor, or None for a single worker or when the platform can't create one, e.g. a
+        serverless runtime without /dev/shm for the pool's queues and locks
+    """
+    if max_workers == 1:
+        return None
+    try:
+        return ProcessPoolExecutor(max_workers=max_workers)
+    except (OSError, NotImplementedError) as e:
+        print(f"Process pool unavailable ({e}), calculating serially")
+        return None
+
+def calculate_sharded_epa_opr(events, season, region_code="", max_workers=None, epa_parameters=DEFAULT_EPA_PARAMETERS):
+    """
+    Calculate epa and opr for all teams by splitting the events into shards which share no teams and
+    calculating each shard in its own process, the result is identical to calculate_all_epa_opr
+    :param season: Four digit representing the year of the game
+    :param events: List of (event start date, event code) objects sorted from earliest to latest
+    :param region_code: (OPTIONAL) Region Code to use while determining starting average
+    :param max_workers: (OPTIONAL) Number of processes, defaults to the number of CPUs, 1 calculates serially
+    :param epa_parameters: (OPTIONAL) Parameters of the EPA model
+    :return: A list of all teams who have participated in atleast one of the given events with updated statistics
+    """
+    start_averages = calculate_season_start_avg(season, region_code, epa_parameters)  # shared by every shard
+    shards = shard_events(events, season) if max_workers != 1 else [events]
+
+    executor = process_pool(max_workers) if len(shards) > 1 else None
+    if executor is None:
+        return calculate_all_epa_opr(events, season, region_code, start_averages=start_averages,
+                                     epa_parameters=epa_parameters)
+
+    all_teams: dict[str, Team] = {}
+    with executor:
+        futures = [executor.submit(calculate_all_epa_opr, shard, season, region_code, start_averages=start_averages,
+                                   epa_parameters=epa_parameters)
+                   for shard in shards]
+        # Shards share no teams, so merging never overwrites a team
+        for future in futures:
+            all_teams.update(future.result())
+
+    return all_teams
+
+def calculate_seasons_epa_opr(seasons, region_code="", epa_parameters=DEFAULT_EPA_PARAMETERS, max_workers=None):
+    """
+    Calculate epa and opr for all teams in several seasons at once, each season is run in its own process
+    :param seasons: List of four digit years representing the seasons
+    :param region_code: (OPTIONAL) Region Code to use while determining starting averages
+    :param epa_parameters: (OPTIONAL) Parameters of the EPA model
+    :param max_workers: (OPTIONAL) Number of processes shared by the seasons and their shards, defaults to the
+        number of CPUs, 1 calculates serially
+    :return: Dictionary of season to the teams of that season with updated statistics
+    """
+    # Each season runs its own shard pool, so the workers are split between the seasons
+    shard_workers = max(1, (max_workers or os.cpu_count() or 1) // len(seasons))
+
+    # A single season needs no worker process of its own
+    executor = process_pool(min(len(seasons), max_workers or len(seasons))) if len(seasons) > 1 else None
+    if executor is None:
+        return {season: calculate_world_epa_opr(season, region_code, epa_parameters,
+                                                max_workers if len(seasons) == 1 else shard_workers)
+                for season in seasons}
+
+    with executor:
+        futures = {season: executor.submit(calculate_world_epa_opr, season, region_code, epa_parameters, shard_workers)
+                   for season in seasons}
+        return {season: future.result() for season, future in futures.items()}
+
+def register_teams(all_teams, records: MatchRecords, avg_total, avg_auto, avg_teleop):
+    """
+    Add teams seen for the first time to the list of all teams and record their event rankings
+    :param all_teams: Dictionary of all teams processed so far
+    :param records: Normalized matches of the event being processed
+    :param avg_total: Starting total EPA for new teams
+    :param avg_auto: Starting auto EPA for new teams
+    :param avg_teleop: Starting teleop EPA for new teams
+    """
+    print(f"Processing {len(records.teams)} teams from event: {records.event_code}")
+    for team_number in records.teams:
+        team = records.teams[team_number]
+        team.update_epa(avg_total)
+        team.update_auto_epa(avg_auto)
+        team.update_tele_epa(avg_teleop)
+
+        if team_number not in all_teams.keys():
+            all_teams[team.team_number] = team
+        all_teams[team.team_number].add_event(records.event_code)
+
+        if records.event_code in team.rankings:
+            all_teams[team.team_number].update_event_rank(records.event_code, team.rankings[records.event_code])
+
+
+def apply_opr(records: MatchRecords, all_teams):
+    """
+    Rating consumer, solves the OPR of every team at the event
+    :param records: Normalized matches of the event
+    :param all_teams: Dictionary of all teams processed so far
+    """
+    if len(records) == 0:  # skip events with no games
+        return
+
+    # Solve all four score components at once
+    oprs = np.linalg.lstsq(records.game_matrix(), records.score_matrix(), rcond=None)[0]
+
+    for i in range(len(records.team_numbers)):
+        team_obj = all_teams[records.team_numbers[i]]  # Use team number from team list to get team
+        team_obj.update_opr(oprs[i, 0], oprs[i, 1], oprs[i, 2], oprs[i, 3])
+
+
+def apply_epa(records: MatchRecords, all_teams, parameters: EpaParameters = DEFAULT_EPA_PARAMETERS):
+    """
+    Rating consumer, updates EPA match by match in the order the matches were played
+    :param records: Normalized matches of the event
+    :param all_teams: Dictionary of all teams processed so far
+    :param parameters: (OPTIONAL) Parameters of the EPA model
+    """
+    for match_number, alliances, scores in zip(records.match_numbers, records.alliances, records.scores):
+        team1 = all_teams[records.team_numbers[alliances[RED, 0]]]
+        team2 = all_teams[records.team_numbers[alliances[RED, 1]]]
+        team3 = all_teams[records.team_numbers[alliances[BLUE, 0]]]
+        team4 = all_teams[records.team_numbers[alliances[BLUE, 1]]]
+
+        # Matches reflected in the ratings, so live mode never applies a match twice
+        for team in (team1, team2, team3, team4):
+            team.add_match(records.event_code, match_number)
+
+        # Strength of schedule uses the opposing alliance's EPA going into the match
+        red_epa = team1.epa_total + team2.epa_total
+        blue_epa = team3.epa_total + team4.epa_total
+        team1.add_opponent_epa(records.event_code, blue_epa)
+        team2.add_opponent_epa(records.event_code, blue_epa)
+        team3.add_opponent_epa(records.event_code, red_epa)
+        team4.add_opponent_epa(records.event_code, red_epa)
+
+        red_score = scores[RED]
+        blue_score = scores[BLUE]
+        update_epa(team1, team2, team3, team4, red_score[0], blue_score[0], parameters)
+        update_epa_auto(team1, team2, team3, team4, red_score[1], blue_score[1], parameters)
+        update_epa_tele(team1, team2, team3, team4, red_score[2], blue_score[2], parameters)
+
+
+def default_consumers(epa_parameters=DEFAULT_EPA_PARAMETERS):
+    """
+    :param epa_parameters: (OPTIONAL) Parameters of the EPA model
+    :return: Rating consumers applied to every event, in order
+    """
+    return apply_opr, partial(apply_epa, parameters=epa_parameters)
+
+
+def calculate_season_start_avg(season, region_code="", epa_parameters=DEFAULT_EPA_PARAMETERS):
+    """
+    Calculates the start of the season averages from the world or from a single region
+    :param season: Four digit representing the year of the game
+    :param region_code: (OPTIONAL) Region Code to use while determining starting average
+    :param epa_parameters: (OPTIONAL) Parameters of the EPA model, selects the events used for the averages
+    :return: Average total score, average auto score, average teleop score
+    """
+    early_events = get_all_events(season, region_code)
+
+    if region_code: print("Calculating Starting Averages from Region:", region_code)
+    else: print("Calculating Starting Average from World Teams")
+
+    return calculate_start_avg(early_events, season, epa_parameters.baseline_months)
+
+def calculate_all_epa_opr(events, season, region_code="", match_stream=None, consumers=None,
+                          start_averages=None, epa_parameters=DEFAULT_EPA_PARAMETERS):
     """
     Calculate and update epa and opr for all teams, able to be filtered by specifying a list of events
     :param season: Four digit representing the year of the game
     :param events: List of (event start date, event code) object
     :param region_code: (OPTIONAL) Region Code to use while determining starting average
+    :param match_stream: (OPTIONAL) Iterable of MatchRecords to use instead of the cache or the FTC API
+    :param consumers: (OPTIONAL) Rating consumers called with the MatchRecords of each event and all teams,
+        defaults to default_consumers(epa_parameters)
+    :param start_averages: (OPTIONAL) Precomputed (total, auto, teleop) starting averages
+    :param epa_parameters: (OPTIONAL) Parameters of the EPA model
     :return: A list of all teams who have participated in atleast one of the given events with updated statistics
     """
 
     all_teams: dict[str, Team] = {}
 
     # Calculate Averages
-    early_events = get_all_events() if region_code == "" else get_all_events(region_code)
+    if start_averages is None:
+        start_averages = calculate_season_start_avg(season, region_code, epa_parameters)
+    avg_total, avg_auto, avg_teleop = start_averages
 
-    if region_code: print("Calculating Starting Averages from Region:", region_code)
-    else: print("Calculating Starting Average from World Teams")
+    if match_stream is None:  # read from the normalized season cache when STATS_CACHE_DIR is set
+        match_stream = cached_event_matches(events, season)
+    if consumers is None:
+        consumers = default_consumers(epa_parameters)
 
-    avg_total, avg_auto, avg_teleop = calculate_start_avg(early_events, season)
-
-    event_codes = [event[1] for event in events] # get event codes from tuple
-
-    for event in event_codes:
-        team_list = create_team_list(event, season) # List of team numbers needed
-        team_number_list =  []
-        print(f"Processing {len(team_list.values())} teams from event: {event}")
-        for team_number in team_list:
-            team = team_list[team_number]
-            team_number_list.append(team.team_number)
-            team.update_epa(avg_total)
-            team.update_auto_epa(avg_auto)
-            team.update_tele_epa(avg_teleop)
-
-            if team_number not in all_teams.keys():
-                all_teams[team.team_number] = team
-
-            if event in team.rankings:
-                all_teams[team.team_number].update_event_rank(event, team.rankings[event])
-        game_matrix = create_game_matrix(event, team_number_list, season)
-
-        if len(game_matrix) > 0:  # skip events with no games
-            # Get relevant scoring data from the event
-            total_match_score, auto_match_score, tele_match_score, end_match_score = obtain_score_data(event, season)
-
-            # Calculate OPR
-            total_opr = np.linalg.lstsq(game_matrix, total_match_score)[0]
-            auto_opr = np.linalg.lstsq(game_matrix, auto_match_score)[0]
-            tele_opr = np.linalg.lstsq(game_matrix, tele_match_score)[0]
-            end_opr = np.linalg.lstsq(game_matrix, end_match_score)[0]
-
-            for i in range(len(team_number_list)):
-                team_number = team_number_list[i] # Use team number from team list to get team
-                team_obj = all_teams[team_number]
-                team_obj.update_opr(total_opr[i], auto_opr[i], tele_opr[i], end_opr[i])
-
-            for i in range(0, len(game_matrix), 2):
-                red_index = np.where(np.array(game_matrix[i]) == 1)[0]
-                team1 = all_teams[team_number_list[red_index[0]]]
-                team2 = all_teams[team_number_list[red_index[1]]]
-
-                blue_index = np.where(np.array(game_matrix[i+1]) == 1)[0]
-                team3 = all_teams[team_number_list[blue_index[0]]]
-                team4 = all_teams[team_number_list[blue_index[1]]]
-
-                # Use i as the index the red alliances score, therefore i+1 will be the index of the blue alliances'
-                update_epa(team1, team2, team3, team4, total_match_score[i], total_match_score[i+1])
-                update_epa_auto(team1, team2, team3, team4, auto_match_score[i], auto_match_score[i+1])
-                update_epa_tele(team1, team2, team3, team4, tele_match_score[i],  tele_match_score[i+1])
+    # Events are pulled one at a time so only the event being processed is held in memory
+    for records in match_stream:
+        register_teams(all_teams, records, avg_total, avg_auto, avg_teleop)
+        for consumer in consumers:
+            consumer(records, all_teams)
 
     return all_teams
 
-def get_epa_parameters(team_red_1: Team, team_red_2: Team, team_blue_1: Team, team_blue_2: Team):
+def get_epa_parameters(team_red_1: Team, team_red_2: Team, team_blue_1: Team, team_blue_2: Team,
+                       parameters: EpaParameters = DEFAULT_EPA_PARAMETERS):
     """
     Calculate the correct m and k EPA parameters given 4 teams
     :param team_red_1: A valid team object
     :param team_red_2: A valid team object
     :param team_blue_1: A valid team object
     :param team_blue_2: A valid team object
+    :param parameters: (OPTIONAL) Parameters of the EPA model
     :return: m and k values for EPA calculation
     """
-    k = 0.33
-    m = 0
     games_played = (team_red_1.games_played + team_red_2.games_played +
                     team_blue_1.games_played + team_blue_2.games_played) / 4
-    if 6 < games_played <= 12:
-        k = 0.33 - (games_played - 6) / 45
-    elif 12 < games_played <= 36:
-        k = 0.2
-        # m = (games_played - 12)/24 # Commented out due to non-defensive nature of this season's game
-    elif games_played > 36:
-        k = 0.2
-        # m = 1
-
-    return m, k
+    return parameters.schedule(games_played)
 
 
 # Team Specific Functions
 def update_epa(team_red_1: Team, team_red_2: Team, team_blue_1: Team, team_blue_2: Team, red_score: int,
-               blue_score: int):
+               blue_score: int, parameters: EpaParameters = DEFAULT_EPA_PARAMETERS):
     """
     Update epa for all provided teams given a score for both
     :param team_red_1: A valid team object
@@ -261,9 +388,10 @@ def update_epa(team_red_1: Team, team_red_2: Team, team_blue_1: Team, team_blue_
     :param team_blue_2: A valid team object
     :param red_score: Nonpenalty total score for the red alliance
     :param blue_score: Nonpenalty total score for the blue alliance
+    :param parameters: (OPTIONAL) Parameters of the EPA model
     """
 
-    m, k = get_epa_parameters(team_red_1, team_red_2, team_blue_1, team_blue_2)
+    m, k = get_epa_parameters(team_red_1, team_red_2, team_blue_1, team_blue_2, parameters)
 
     red_epa = team_red_1.epa_total + team_red_2.epa_total
     blue_epa = team_blue_1.epa_total + team_blue_2.epa_total
@@ -278,7 +406,7 @@ def update_epa(team_red_1: Team, team_red_2: Team, team_blue_1: Team, team_blue_
 
 
 def update_epa_auto(team_red_1: Team, team_red_2: Team, team_blue_1: Team, team_blue_2: Team, red_score: int,
-                    blue_score: int):
+                    blue_score: int, parameters: EpaParameters = DEFAULT_EPA_PARAMETERS):
     """
     Update epa for all provided teams given a score for both
     :param team_red_1: A valid team object
@@ -287,9 +415,10 @@ def update_epa_auto(team_red_1: Team, team_red_2: Team, team_blue_1: Team, team_
     :param team_blue_2: A valid team object
     :param red_score: Total auto score for the red alliance
     :param blue_score: Total auto score for the blue alliance
+    :param parameters: (OPTIONAL) Parameters of the EPA model
     """
 
-    m, k = get_epa_parameters(team_red_1, team_red_2, team_blue_1, team_blue_2)
+    m, k = get_epa_parameters(team_red_1, team_red_2, team_blue_1, team_blue_2, parameters)
 
     red_epa = team_red_1.epa_auto_total + team_red_2.epa_auto_total
     blue_epa = team_blue_1.epa_auto_total + team_blue_2.epa_auto_total
@@ -304,7 +433,7 @@ def update_epa_auto(team_red_1: Team, team_red_2: Team, team_blue_1: Team, team_
 
 
 def update_epa_tele(team_red_1: Team, team_red_2: Team, team_blue_1: Team, team_blue_2: Team, red_score: int,
-                    blue_score: int):
+                    blue_score: int, parameters: EpaParameters = DEFAULT_EPA_PARAMETERS):
     """
     Update epa for all provided teams given a score for both
     :param team_red_1: A valid team object
@@ -313,9 +442,10 @@ def update_epa_tele(team_red_1: Team, team_red_2: Team, team_blue_1: Team, team_
     :param team_blue_2: A valid team object
     :param red_score: Total teleop score for the red alliance
     :param blue_score: Total teleop score for the blue alliance
+    :param parameters: (OPTIONAL) Parameters of the EPA model
     """
 
-    m, k = get_epa_parameters(team_red_1, team_red_2, team_blue_1, team_blue_2  )
+    m, k = get_epa_parameters(team_red_1, team_red_2, team_blue_1, team_blue_2, parameters)
 
     red_epa = team_red_1.epa_tele_total + team_red_2.epa_tele_total
     blue_epa = team_blue_1.epa_tele_total + team_blue_2.epa_tele_total
@@ -0,0 +1,53 @@
+class EpaParameters:
+    """
+    Parameters of the EPA model, the defaults are the values the ratings have always been calculated with
+    """
+
+    def __init__(self, k_start=0.33, k_end=0.2, k_decay_games=45, k_decay_start=6, k_decay_end=12,
+                 margin=False, margin_start=12, margin_end=36, baseline_months=(10, 11)):
+        """
+        :param k_start: Update rate while teams have played at most k_decay_start games
+        :param k_end: Update rate once teams have played more than k_decay_end games
+        :param k_decay_games: The update rate decreases by 1 / k_decay_games per game between k_decay_start and k_decay_end
+        :param k_decay_start: Average games played after which the update rate starts decreasing
+        :param k_decay_end: Average games played after which the update rate is k_end
+        :param margin: Whether the opposing alliance's score is used (the m term), off for non-defensive games
+        :param margin_start: Average games played after which the m term starts growing
+        :param margin_end: Average games played after which the m term is 1
+        :param baseline_months: Months of the events used to calculate the season's starting averages
+        """
+        self.k_start = k_start
+        self.k_end = k_end
+        self.k_decay_games = k_decay_games
+        self.k_decay_start = k_decay_start
+        self.k_decay_end = k_decay_end
+        self.margin = margin
+        self.margin_start = margin_start
+        self.margin_end = margin_end
+        self.baseline_months = tuple(baseline_months)
+
+    def schedule(self, games_played):
+        """
+        :param games_played: Average games played by the four teams of a match
+        :return: m and k values for EPA calculation
+        """
+        k = self.k_start
+        m = 0
+        if self.k_decay_start < games_played <= self.k_decay_end:
+            k = self.k_start - (games_played - self.k_decay_start) / self.k_decay_games
+        elif games_played > self.k_decay_end:
+            k = self.k_end
+
+        if self.margin and games_played > self.margin_start:
+            m = min((games_played - self.margin_start) / (self.margin_end - self.margin_start), 1)
+
+        return m, k
+
+    def __repr__(self):
+        return (f"EpaParameters(k_start={self.k_start}, k_end={self.k_end}, k_decay_games={self.k_decay_games}, "
+                f"k_decay_start={self.k_decay_start}, k_decay_end={self.k_decay_end}, margin={self.margin}, "
+                f"margin_start={self.margin_start}, margin_end={self.margin_end}, "
+                f"baseline_months={self.baseline_months})")
+
+
+DEFAULT_EPA_PARAMETERS = EpaParameters()
@@ -0,0 +1,189 @@
+import numpy as np
+import requests
+
+from stats.data import get_auth
+from stats.event import create_team_list
+from stats.seasons import get_scoring_adapter
+
+# Order of the score components stored in MatchRecords.scores
+SCORE_COMPONENTS = ('total', 'auto', 'tele', 'end')
+
+RED = 0
+BLUE = 1
+
+
+class EventPayload:
+    """
+    Raw data retrieved from the FTC API for a single event
+    """
+
+    def __init__(self, event_code, season, teams, matches, scores):
+        """
+        :param event_code: FIRST Event Code
+        :param season: Four digit year representing the season
+        :param teams: Dictionary of team objects from create_team_list
+        :param matches: JSON list of qualification matches
+        :param scores: JSON list of qualification match scores
+        """
+        self.event_code = event_code
+        self.season = season
+        self.teams = teams
+        self.matches = matches
+        self.scores = scores
+
+
+class MatchRecords:
+    """
+    Compact, normalized qualification matches for a single event
+    """
+
+    def __init__(self, event_code, teams, team_numbers, alliances, scores, match_numbers=None):
+        """
+        :param event_code: FIRST Event Code
+        :param teams: Dictionary of team objects participating at the event
+        :param team_numbers: List of team numbers, the position of each team is its index in alliances
+        :param alliances: int32 array of shape (matches, 2, 2) holding [match, red/blue, slot] -> team index
+        :param scores: float64 array of shape (matches, 2, 4) holding [match, red/blue, component] -> points
+        :param match_numbers: (OPTIONAL) Qualification match number of each match, defaults to 1 to the number of matches
+        """
+        self.event_code = event_code
+        self.teams = teams
+        self.team_numbers = team_numbers
+        self.alliances = alliances
+        self.scores = scores
+        self.match_numbers = match_numbers if match_numbers is not None else list(range(1, len(alliances) + 1))
+
+    def __len__(self):
+        return len(self.alliances)
+
+    def game_matrix(self):
+        """
+        Build the game matrix, one row per alliance (red then blue for every match) and one column per team
+        :return: Array of shape (2 * matches, teams) with a 1 wherever a team played on that alliance
+        """
+        game_matrix = np.zeros((2 * len(self), len(self.team_numbers)))
+        rows = np.repeat(np.arange(2 * len(self)), 2)
+        game_matrix[rows, self.alliances.reshape(-1)] = 1
+        return game_matrix
+
+    def score_matrix(self):
+        """
+        :return: Array of shape (2 * matches, 4) with the score components of each alliance, rows match the game matrix
+        """
+        return self.scores.reshape(-1, len(SCORE_COMPONENTS))
+
+
+def fetch_matches(event_code, season):
+    """
+    Retrieve the qualification matches played at an event
+    :param season: Four digit year representing the season
+    :param event_code: Valid FIRST Event Code
+    :return: JSON list of matches
+    """
+    response = requests.get(
+        f"http://ftc-api.firstinspires.org/v2.0/{season}/matches/" + event_code + "?tournamentLevel=qual", auth=get_auth())
+    return response.json()['matches']  # only grab from qualifiers to equally compare all teams
+
+
+def fetch_scores(event_code, season):
+    """
+    Retrieve the detailed qualification match scores of an event
+    :param season: Four digit year representing the season
+    :param event_code: Valid FIRST Event Code
+    :return: JSON list of match scores
+    """
+    response = requests.get(f"https://ftc-api.firstinspires.org/v2.0/{season}/scores/" + event_code + "/qual",
+                            auth=get_auth())  # only grab from qualifiers to equally compare all teams
+    return response.json()['matchScores']
+
+
+def score_components(alliance, season):
+    """
+    Split the score of a single alliance into its components
+    :param alliance: JSON alliance object from a match score
+    :param season: Four digit year representing the season
+    :return: A tuple of total score, auto score, teleop score and endgame score
+    """
+    return get_scoring_adapter(season)(alliance)
+
+
+def event_source(events):
+    """
+    First stage of the pipeline, yields the event codes to process
+    :param events: List of (event start date, event code) objects
+    """
+    for event in events:
+        yield event[1]
+
+
+def fetch_event_payloads(event_codes, season):
+    """
+    Lazily retrieve the raw data for each event, only one event is held in memory at a time
+    :param event_codes: Iterable of FIRST Event Codes
+    :param season: Four digit year representing the season
+    """
+    for event_code in event_codes:
+        teams = create_team_list(event_code, season)
+        matches = fetch_matches(event_code, season)
+        scores = fetch_scores(event_code, season) if len(matches) > 0 else []  # skip events with no games
+        yield EventPayload(event_code, season, teams, matches, scores)
+
+
+def normalize_event(payload: EventPayload):
+    """
+    Convert the raw data of an event into compact match records
+    :param payload: Raw event data
+    :return: MatchRecords for the event
+    """
+    team_numbers = [team.team_number for team in payload.teams.values()]
+    team_index = {team_number: i for i, team_number in enumerate(team_numbers)}
+
+    if len(payload.matches) != len(payload.scores):
+        raise ValueError(f"Event {payload.event_code} has {len(payload.matches)} matches "
+                         f"but {len(payload.scores)} match scores")
+
+    alliances = np.zeros((len(payload.matches), 2, 2), dtype=np.int32)
+    scores = np.zeros((len(payload.matches), 2, len(SCORE_COMPONENTS)))
+
+    for i, match in enumerate(payload.matches):
+        red_alliance = []
+        blue_alliance = []
+
+        # for each match find if each team is on a red or blue alliance team
+        for team in match['teams']:
+            alliance = team['station']
+            if alliance == 'Red1' or alliance == 'Red2':
+                red_alliance.append(team_index[team['teamNumber']])
+            else:
+                blue_alliance.append(team_index[team['teamNumber']])
+
+        # Teams are kept in team list order within an alliance
+        alliances[i, RED] = sorted(red_alliance)
+        alliances[i, BLUE] = sorted(blue_alliance)
+
+    adapter = get_scoring_adapter(payload.season)
+    for i, match_score in enumerate(payload.scores):
+        scores[i, RED] = adapter(match_score['alliances'][1])
+        scores[i, BLUE] = adapter(match_score['alliances'][0])
+
+    match_numbers = [match['matchNumber'] for match in payload.matches]
+    return MatchRecords(payload.event_code, payload.teams, team_numbers, alliances, scores, match_numbers)
+
+
+def normalize_events(payloads):
+    """
+    Normalize each raw event payload as it arrives
+    :param payloads: Iterable of EventPayload objects
+    """
+    for payload in payloads:
+        yield normalize_event(payload)
+
+
+def stream_event_matches(events, season):
+    """
+    Default pipeline, retrieves and normalizes each event from the FTC API in order
+    :param events: List of (event start date, event code) objects
+    :param season: Four digit year representing the season
+    :return: A generator of MatchRecords, one per event
+    """
+    return normalize_events(fetch_event_payloads(event_source(events), season))
@@ -0,0 +1,86 @@
+import numpy as np
+
+# Columns of TeamRatings.values
+RATING_FIELDS = ('epa_total', 'auto_epa_total', 'tele_epa_total', 'opr', 'opr_auto', 'opr_tele', 'opr_end')
+
+EPA_COMPONENTS = {'total': 0, 'auto': 1, 'tele': 2}
+OPR_COMPONENTS = {'total': 3, 'auto': 4, 'tele': 5, 'end': 6}
+
+
+def win_probability_scale(epa_totals):
+    """
+    A total EPA difference of one scale makes the favourite ten times as likely to win, the scale is twice the
+    spread of the rated teams' total EPA
+    :param epa_totals: Total EPA of every rated team, of shape (teams,) or (teams, rating sets)
+    :return: The scale, one per rating set for a two dimensional array
+    """
+    epa_totals = np.asarray(epa_totals, dtype=float)
+    if len(epa_totals) == 0:
+        return np.ones(epa_totals.shape[1:])
+    return np.maximum(2 * np.std(epa_totals, axis=0), 1)
+
+
+def win_probability(red_epa, blue_epa, scale):
+    """
+    :param red_epa: Total EPA of the red alliance
+    :param blue_epa: Total EPA of the blue alliance
+    :param scale: See win_probability_scale
+    :return: Probability of the red alliance winning
+    """
+    return 1 / (1 + 10 ** ((blue_epa - red_epa) / scale))
+
+
+class TeamRatings:
+    """
+    Ratings of every team in a season stored as one matrix so alliances can be scored in a single pass
+    """
+
+    def __init__(self, team_numbers, values):
+        """
+        :param team_numbers: List of team numbers
+        :param values: Array of shape (teams, len(RATING_FIELDS)) with the ratings of each team
+        """
+        order = np.argsort(team_numbers)
+        self.team_numbers = np.asarray(team_numbers, dtype=np.int64)[order]
+        self.values = np.nan_to_num(np.asarray(values, dtype=float).reshape(-1, len(RATING_FIELDS))[order])
+
+        self.scale = float(win_probability_scale(self.values[:, 0]))
+
+    @staticmethod
+    def from_rows(rows):
+        """
+        :param rows: Iterable of (team_number, *RATING_FIELDS) tuples
+        """
+        rows = list(rows)
+        return TeamRatings([row[0] for row in rows], [row[1:] for row in rows])
+
+    def index_of(self, team_numbers):
+        """
+        :param team_numbers: Array of team numbers of any shape
+        :return: Array of the same shape with the row of each team
+        :raises KeyError: If a team has no ratings
+        """
+        team_numbers = np.asarray(team_numbers, dtype=np.int64)
+        if len(self.team_numbers) == 0 and team_numbers.size > 0:
+            raise KeyError(int(team_numbers.flat[0]))
+
+        indices = np.searchsorted(self.team_numbers, team_numbers).clip(max=len(self.team_numbers) - 1)
+        missing = self.team_numbers[indices] != team_numbers
+        if missing.any():
+            raise KeyError(int(team_numbers[missing][0]))
+        return indices
+
+
+def predict_matches(ratings: TeamRatings, red_teams, blue_teams):
+    """
+    Predict the score components and win probability of a batch of matches
+    :param ratings: Ratings of the season
+    :param red_teams: Team numbers of shape (matches, 2)
+    :param blue_teams: Team numbers of shape (matches, 2)
+    :return: A tuple of the red alliance ratings, the blue alliance ratings, both of shape
+        (matches, len(RATING_FIELDS)), and the probability of the red alliance winning each match
+    """
+    red = ratings.values[ratings.index_of(red_teams)].sum(axis=1)
+    blue = ratings.values[ratings.index_of(blue_teams)].sum(axis=1)
+
+    return red, blue, win_probability(red[:, 0], blue[:, 0], ratings.scale)
@@ -0,0 +1,40 @@
+# Scoring adapters, mapping each season's matchScores alliance schema to score components
+
+
+def score_into_the_deep(alliance):
+    """
+    2024 INTO THE DEEP
+    :param alliance: JSON alliance object from a match score
+    :return: A tuple of total score, auto score, teleop score and endgame score
+    """
+    teleop_sample_spec = alliance['teleopSamplePoints'] + alliance['teleopSpecimenPoints']
+    return (alliance['preFoulTotal'], alliance['autoPoints'], teleop_sample_spec,
+            alliance['teleopPoints'] - teleop_sample_spec)
+
+
+def score_powerplay_centerstage(alliance):
+    """
+    2022 POWERPLAY and 2023 CENTERSTAGE, both seasons share the same score schema
+    :param alliance: JSON alliance object from a match score
+    :return: A tuple of total score, auto score, teleop score and endgame score
+    """
+    return alliance['prePenaltyTotal'], alliance['autoPoints'], alliance['dcPoints'], alliance['endgamePoints']
+
+
+SCORING_ADAPTERS = {
+    2022: score_powerplay_centerstage,
+    2023: score_powerplay_centerstage,
+    2024: score_into_the_deep,
+}
+
+
+def get_scoring_adapter(season):
+    """
+    Get the scoring adapter for a season
+    :param season: Four digit year representing the season
+    :return: A function splitting an alliance score into total, auto, teleop and endgame points
+    """
+    adapter = SCORING_ADAPTERS.get(int(season))
+    if adapter is None:
+        raise ValueError(f"No scoring adapter for season {season}, supported seasons: {sorted(SCORING_ADAPTERS)}")
+    return adapter
@@ -0,0 +1,82 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from stats.data import get_auth, get_cache_dir
+from stats.store import load_team_numbers
+
+
+def get_event_team_numbers(event_code, season):
+    """
+    Retrieve only the team numbers registered at an event
+    :param season: Four digit year representing the season
+    :param event_code: FIRST Event Code
+    :return: List of team numbers
+    """
+    team_response = requests.get(f"https://ftc-api.firstinspires.org/v2.0/{season}/teams?eventCode="+event_code, auth=get_auth())
+    return [team['teamNumber'] for team in team_response.json()['teams']]
+
+
+def split_connected_events(events, rosters):
+    """
+    Split events into groups that share no teams with each other, the connected components of the
+    team/event interaction graph
+    :param events: List of (event start date, event code) objects sorted from earliest to latest
+    :param rosters: Dictionary of event code to the team numbers at that event
+    :return: List of event lists, each sorted from earliest to latest, ordered by their first event
+    """
+    parent = list(range(len(events)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # Join every event with the first event each of its teams was seen at
+    first_event_of_team = {}
+    for i, event in enumerate(events):
+        for team_number in rosters[event[1]]:
+            if team_number not in first_event_of_team:
+                first_event_of_team[team_number] = i
+                continue
+
+            root_a, root_b = find(i), find(first_event_of_team[team_number])
+            if root_a != root_b:
+                parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    # Events are visited in date order so each component stays sorted and components are ordered by first event
+    components = {}
+    for i, event in enumerate(events):
+        components.setdefault(find(i), []).append(event)
+
+    return list(components.values())
+
+
+def shard_events(events, season):
+    """
+    Group events into independent shards which can be calculated in parallel
+    :param events: List of (event start date, event code) objects sorted from earliest to latest
+    :param season: Four digit year representing the season
+    :return: List of event lists, see split_connected_events
+    """
+    event_codes = [event[1] for event in events]
+
+    # Cached events already hold their rosters
+    rosters = {}
+    cache_dir = get_cache_dir()
+    if cache_dir:
+        for event_code in event_codes:
+            team_numbers = load_team_numbers(cache_dir, season, event_code)
+            if team_numbers is not None:
+                rosters[event_code] = team_numbers
+    missing = [event_code for event_code in event_codes if event_code not in rosters]
+
+    # Roster requests are network bound, retrieve them concurrently
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        team_lists = executor.map(lambda event_code: get_event_team_numbers(event_code, season), missing)
+        rosters.update(zip(missing, team_lists))
+
+    shards = split_connected_events(events, rosters)
+    print(f"Split {len(events)} events into {len(shards)} independent shards")
+    return shards
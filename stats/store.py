@@ -0,0 +1,139 @@
+"""
+On-disk store of normalized season data, one directory per event holding plain .npy arrays:
+
+    <cache dir>/<season>/<event code>/team_numbers.npy  int32 (teams,)
+                                     alliances.npy     int32 (matches, 2, 2)
+                                     scores.npy        float64 (matches, 2, 4)
+                                     teams.npy         structured array of team info and event rank
+                                     match_numbers.npy int32 (matches,)
+
+Arrays are loaded memory-mapped, so cached events are read without any JSON parsing or copying.
+"""
+import os
+import shutil
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from stats.data import get_cache_dir
+from stats.pipeline import MatchRecords, stream_event_matches
+from stats.team import Team
+
+TEAM_INFO_FIELDS = ('name', 'country', 'state_prov', 'city', 'home_region')
+NO_RANK = -1
+
+
+def event_dir(cache_dir, season, event_code):
+    return os.path.join(cache_dir, str(season), event_code)
+
+
+def save_event(cache_dir, season, records: MatchRecords):
+    """
+    Write the normalized matches of an event, the event directory is renamed into place once complete
+    :param cache_dir: Root directory of the cache
+    :param season: Four digit year representing the season
+    :param records: Normalized matches of the event
+    """
+    final_dir = event_dir(cache_dir, season, records.event_code)
+    tmp_dir = f"{final_dir}.tmp-{os.getpid()}"
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    teams = list(records.teams.values())
+    dtype = [('team_number', '<i4'), ('rank', '<i4')] + [
+        (field, f"<U{max([len(getattr(team, field) or '') for team in teams] + [1])}") for field in TEAM_INFO_FIELDS]
+    team_info = np.array([(team.team_number, team.rankings.get(records.event_code, NO_RANK),
+                           *[getattr(team, field) or '' for field in TEAM_INFO_FIELDS]) for team in teams], dtype=dtype)
+
+    np.save(os.path.join(tmp_dir, 'team_numbers.npy'), np.asarray(records.team_numbers, dtype=np.int32))
+    np.save(os.path.join(tmp_dir, 'alliances.npy'), np.ascontiguousarray(records.alliances, dtype=np.int32))
+    np.save(os.path.join(tmp_dir, 'scores.npy'), np.ascontiguousarray(records.scores, dtype=np.float64))
+    np.save(os.path.join(tmp_dir, 'teams.npy'), team_info)
+    np.save(os.path.join(tmp_dir, 'match_numbers.npy'), np.asarray(records.match_numbers, dtype=np.int32))
+
+    try:
+        os.replace(tmp_dir, final_dir)
+    except OSError:  # written by another process in the meantime
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def load_event(cache_dir, season, event_code):
+    """
+    Load the normalized matches of an event without copying the arrays
+    :param cache_dir: Root directory of the cache
+    :param season: Four digit year representing the season
+    :param event_code: FIRST Event Code
+    :return: MatchRecords for the event, or None if the event is not cached
+    """
+    directory = event_dir(cache_dir, season, event_code)
+    if not os.path.isdir(directory):
+        return None
+
+    team_numbers = np.load(os.path.join(directory, 'team_numbers.npy'), mmap_mode='r')
+    alliances = np.load(os.path.join(directory, 'alliances.npy'), mmap_mode='r')
+    scores = np.load(os.path.join(directory, 'scores.npy'), mmap_mode='r')
+    team_info = np.load(os.path.join(directory, 'teams.npy'), mmap_mode='r')
+
+    # Events cached before match numbers were stored keep the default numbering
+    match_numbers_path = os.path.join(directory, 'match_numbers.npy')
+    match_numbers = np.load(match_numbers_path).tolist() if os.path.exists(match_numbers_path) else None
+
+    teams = {}
+    for row in team_info:
+        team = Team(int(row['team_number']), *[str(row[field]) or None for field in TEAM_INFO_FIELDS])
+        if row['rank'] != NO_RANK:
+            team.update_event_rank(event_code, int(row['rank']))
+        teams[team.team_number] = team
+
+    return MatchRecords(event_code, teams, team_numbers.tolist(), alliances, scores, match_numbers)
+
+
+def load_team_numbers(cache_dir, season, event_code):
+    """
+    Load only the team numbers of a cached event, used to build shard rosters without the FTC API
+    :param cache_dir: Root directory of the cache
+    :param season: Four digit year representing the season
+    :param event_code: FIRST Event Code
+    :return: List of team numbers, or None if the event is not cached
+    """
+    path = os.path.join(event_dir(cache_dir, season, event_code), 'team_numbers.npy')
+    if not os.path.exists(path):
+        return None
+    return np.load(path).tolist()
+
+
+def is_final(event_date, final_after_days):
+    """
+    Events are only cached once they can no longer change
+    :param event_date: ISO start date of the event
+    :param final_after_days: Number of days after the start of an event after which its results are final
+    """
+    return datetime.fromisoformat(event_date) + timedelta(days=final_after_days) < datetime.now()
+
+
+def cached_event_matches(events, season, cache_dir=None, final_after_days=7, fallback=stream_event_matches):
+    """
+    Pipeline source reading events from the cache, events missing from the cache are pulled from the fallback
+    stream and written to the cache once final
+    :param events: List of (event start date, event code) objects
+    :param season: Four digit year representing the season
+    :param cache_dir: (OPTIONAL) Root directory of the cache, defaults to STATS_CACHE_DIR, disabled if unset
+    :param final_after_days: (OPTIONAL) Number of days after the start of an event after which it is cached
+    :param fallback: (OPTIONAL) Pipeline source called with the events missing from the cache and the season,
+        yielding one MatchRecords per event in order, defaults to retrieving them from the FTC API
+    :return: A generator of MatchRecords, one per event
+    """
+    cache_dir = cache_dir or get_cache_dir()
+
+    cached = {event[1] for event in events if cache_dir and os.path.isdir(event_dir(cache_dir, season, event[1]))}
+    missing = [event for event in events if event[1] not in cached]
+    fallback_stream = iter(fallback(missing, season))  # only pulled when a missing event is reached
+
+    for event_date, event_code in events:
+        if event_code in cached:
+            yield load_event(cache_dir, season, event_code)
+            continue
+
+        records = next(fallback_stream)
+        if cache_dir and is_final(event_date, final_after_days):
+            save_event(cache_dir, season, records)
+        yield records
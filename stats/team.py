@@ -8,6 +8,12 @@ class Team:
         # Rankings at each event
         self.rankings = {}
 
+        # Event codes of every event attended, and the EPA of the opposing alliance and the number of each match
+        # at those events
+        self.events = []
+        self.opponent_epa = {}
+        self.matches = {}
+
         self.country = country
         self.state_prov = state_prov
         self.city = city
@@ -31,6 +37,16 @@ class Team:
     def update_event_rank(self, event_code, event_rank):
         self.rankings[event_code] = event_rank
 
+    def add_event(self, event_code):
+        if event_code not in self.events:
+            self.events.append(event_code)
+
+    def add_opponent_epa(self, event_code, opponent_epa):
+        self.opponent_epa.setdefault(event_code, []).append(opponent_epa)
+
+    def add_match(self, event_code, match_number):
+        self.matches.setdefault(event_code, []).append(match_number)
+
     def update_epa(self, new_epa):
         self.epa_total = new_epa
         self.historical_epa.append(new_epa)
@@ -54,5 +70,14 @@ class Team:
       self.opr_tele = opr_tele
       self.opr_end = opr_end
 
+    def revise_opr(self, opr_total, opr_auto, opr_tele, opr_end, replace=True):
+      # Replace the latest opr instead of adding a new one, used when an event's opr is re-solved during the event
+      if replace and self.opr_total_vals:
+        self.opr_total_vals.pop()
+        self.opr_auto_vals.pop()
+        self.opr_tele_vals.pop()
+        self.opr_end_vals.pop()
+      self.update_opr(opr_total, opr_auto, opr_tele, opr_end)
+
     def __repr__(self):
         return f"Team #{self.team_number} | Games Played: {self.games_played} | EPA Total: {self.epa_total}"
\ No newline at end of file